@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency benchmarks for the check_secrets hook.
+
+Builds throwaway git repositories with a synthetic staged commit, then
+drives the real hook (check_secrets_hook.py) the way Claude Code does: one
+process per call, with the tool input as JSON on stdin. For each commit
+size it reports:
+
+- p50/p95 wall time over --runs launches
+- peak RSS of the hook process
+- git subprocesses started per call (counted in one extra run, through a
+  git wrapper put first on PATH, so the timed runs are undisturbed)
+
+Results are written as one JSON document (to stdout, or --output), so runs
+of different versions can be compared. A human-readable summary goes to
+stderr.
+
+Usage:
+    bench_hook.py [--files N[,N...]] [--size-kb KB] [--size-sigma S] [--max-size-kb KB]
+                  [--binary-ratio R] [--env-keys N] [--density N] [--runs N]
+                  [--mode full|diff] [--cache] [--workers N] [--seed N] [--output FILE]
+
+Examples:
+    bench_hook.py
+    bench_hook.py --files 10,100,1000 --runs 20 --output before.json
+    bench_hook.py --files 200 --size-kb 64 --binary-ratio 0.2 --env-keys 300
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_check_secrets import generate_corpus, generate_env_values  # noqa: E402
+
+HOOK_SCRIPT: Path = Path(__file__).resolve().parent / "check_secrets_hook.py"
+RESULTS_VERSION: int = 1  # Bump when the JSON layout changes
+
+COMMIT_PAYLOAD: str = json.dumps(
+    {"tool_name": "Bash", "tool_input": {"command": "git commit -m 'benchmark'"}}
+)
+
+# Binary files alternate between an extension the hook skips by name and
+# one it has to recognize from content
+BINARY_EXTENSIONS: tuple[str, ...] = (".png", ".dat")
+
+
+def generate_repo(
+    root: Path,
+    files: int,
+    size_kb: float,
+    size_sigma: float,
+    max_size_kb: float,
+    binary_ratio: float,
+    env_keys: int,
+    density: int,
+    seed: int,
+) -> dict[str, int]:
+    """Create a git repository at root with a staged synthetic commit.
+
+    File sizes follow a log-normal distribution with median size_kb, capped
+    at max_size_kb. Text files are source-like with density secrets per MB.
+
+    Returns:
+        Counts describing what was staged (files, binary files, bytes)
+    """
+    rng = random.Random(seed)
+    root.mkdir(parents=True)
+    git(root, "init", "-q")
+    git(root, "config", "user.email", "bench@example.com")
+    git(root, "config", "user.name", "Bench")
+
+    env_values = generate_env_values(env_keys, seed=seed)
+    (root / ".env").write_text("".join(f"{key}={value}\n" for key, value in env_values.items()))
+
+    binary_files = 0
+    total_bytes = 0
+    for index in range(files):
+        size = int(min(max_size_kb, rng.lognormvariate(math.log(size_kb), size_sigma)) * 1024)
+        size = max(size, 16)
+        directory = root / f"pkg{index % 16:02d}"
+        directory.mkdir(exist_ok=True)
+        if rng.random() < binary_ratio:
+            extension = BINARY_EXTENSIONS[binary_files % len(BINARY_EXTENSIONS)]
+            data = b"\x00" + rng.randbytes(size - 1)
+            (directory / f"asset{index}{extension}").write_bytes(data)
+            binary_files += 1
+        else:
+            data = generate_corpus(size, density, seed=seed + index).encode()
+            (directory / f"module{index}.py").write_bytes(data)
+        total_bytes += len(data)
+
+    git(root, "add", "-A")
+    return {"files": files, "binary_files": binary_files, "staged_bytes": total_bytes}
+
+
+def git(repo: Path, *args: str) -> str:
+    """Run a git command in repo and return stdout."""
+    return subprocess.run(
+        ["git", *args], cwd=repo, capture_output=True, text=True, check=True
+    ).stdout
+
+
+def hook_environment(repo: Path, mode: str, cache: bool, workers: int | None) -> dict[str, str]:
+    """Environment for a hook launch: in-process scanning, no daemon."""
+    env = dict(os.environ)
+    env.update(
+        {
+            "CLAUDE_PROJECT_DIR": str(repo),
+            "CHECK_SECRETS_DAEMON": "0",
+            "CHECK_SECRETS_CACHE": "1" if cache else "0",
+            "CHECK_SECRETS_SCAN_MODE": mode,
+        }
+    )
+    if workers is not None:
+        env["CHECK_SECRETS_WORKERS"] = str(workers)
+    return env
+
+
+def run_hook(repo: Path, env: dict[str, str]) -> tuple[float, int, int]:
+    """Launch the hook once.
+
+    Returns:
+        (wall seconds, exit code, peak RSS in KB)
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, str(HOOK_SCRIPT)],
+        cwd=repo,
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    assert process.stdin is not None
+    process.stdin.write(COMMIT_PAYLOAD.encode())
+    process.stdin.close()
+    # wait4 reports this child's own resource usage, unlike RUSAGE_CHILDREN
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    # Linux reports ru_maxrss in KB, macOS in bytes
+    peak_rss_kb = usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+    return elapsed, process.returncode, peak_rss_kb
+
+
+def count_git_calls(repo: Path, env: dict[str, str], scratch: Path) -> int:
+    """Run the hook once with a counting git wrapper first on PATH."""
+    real_git = shutil.which("git", path=env.get("PATH"))
+    if real_git is None:
+        raise RuntimeError("git not found on PATH")
+
+    wrapper_dir = scratch / "git-wrapper"
+    wrapper_dir.mkdir(exist_ok=True)
+    log = scratch / "git-calls.log"
+    log.write_text("")
+    wrapper = wrapper_dir / "git"
+    wrapper.write_text(f'#!/bin/sh\necho x >> "{log}"\nexec "{real_git}" "$@"\n')
+    wrapper.chmod(0o755)
+
+    counted_env = dict(env, PATH=f"{wrapper_dir}{os.pathsep}{env.get('PATH', '')}")
+    run_hook(repo, counted_env)
+    return len(log.read_text().splitlines())
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Return the value at fraction (0..1) of the sorted values (nearest rank)."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def bench_scenario(args: argparse.Namespace, files: int, scratch: Path) -> dict[str, object]:
+    """Generate one repository, run the hook against it and summarize."""
+    repo = scratch / f"repo-{files}"
+    staged = generate_repo(
+        repo,
+        files=files,
+        size_kb=args.size_kb,
+        size_sigma=args.size_sigma,
+        max_size_kb=args.max_size_kb,
+        binary_ratio=args.binary_ratio,
+        env_keys=args.env_keys,
+        density=args.density,
+        seed=args.seed,
+    )
+    env = hook_environment(repo, args.mode, args.cache, args.workers)
+
+    git_calls = count_git_calls(repo, env, scratch)  # Also warms the page cache
+    walls: list[float] = []
+    rss: list[int] = []
+    exit_codes: set[int] = set()
+    for _ in range(args.runs):
+        wall, exit_code, peak_rss_kb = run_hook(repo, env)
+        walls.append(wall * 1000)
+        rss.append(peak_rss_kb)
+        exit_codes.add(exit_code)
+
+    print(
+        f"{files:6d} files  p50 {statistics.median(walls):9.1f} ms"
+        f"  p95 {percentile(walls, 0.95):9.1f} ms  rss {max(rss) / 1024:7.1f} MB"
+        f"  git x{git_calls}  exit {sorted(exit_codes)}",
+        file=sys.stderr,
+    )
+    return {
+        "files": files,
+        "staged": staged,
+        "exit_codes": sorted(exit_codes),
+        "git_subprocesses": git_calls,
+        "wall_ms": {
+            "p50": round(statistics.median(walls), 3),
+            "p95": round(percentile(walls, 0.95), 3),
+            "min": round(min(walls), 3),
+            "max": round(max(walls), 3),
+        },
+        "peak_rss_kb": {"p50": int(statistics.median(rss)), "max": max(rss)},
+    }
+
+
+def environment_info() -> dict[str, str]:
+    """Describe the machine and the hook version being measured."""
+    script_dir = HOOK_SCRIPT.parent
+    try:
+        revision = git(script_dir, "rev-parse", "HEAD").strip()
+        if git(script_dir, "status", "--porcelain", "--", ".").strip():
+            revision += "-dirty"
+    except (subprocess.CalledProcessError, OSError):
+        revision = "unknown"
+    return {
+        "hook_revision": revision,
+        "python": platform.python_version(),
+        "git": git(script_dir, "--version").strip(),
+        "platform": platform.platform(),
+        "cpus": str(os.cpu_count()),
+    }
+
+
+def main() -> None:
+    """Run the end-to-end benchmark and write the JSON results."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--files", default="10,100,500", help="staged file counts, comma-separated"
+    )
+    parser.add_argument("--size-kb", type=float, default=8.0, help="median file size in KB")
+    parser.add_argument("--size-sigma", type=float, default=1.0, help="log-normal size spread")
+    parser.add_argument("--max-size-kb", type=float, default=2048.0, help="largest file in KB")
+    parser.add_argument("--binary-ratio", type=float, default=0.1, help="fraction of binary files")
+    parser.add_argument("--env-keys", type=int, default=50, help=".env keys")
+    parser.add_argument("--density", type=int, default=2, help="secrets per MB of text")
+    parser.add_argument("--runs", type=int, default=10, help="timed hook launches per scenario")
+    parser.add_argument("--mode", choices=("full", "diff"), default="full", help="scan mode")
+    parser.add_argument("--cache", action="store_true", help="keep the scan cache enabled")
+    parser.add_argument("--workers", type=int, default=None, help="CHECK_SECRETS_WORKERS")
+    parser.add_argument("--seed", type=int, default=1, help="generator seed")
+    parser.add_argument("--output", type=Path, default=None, help="write JSON here, not stdout")
+    args = parser.parse_args()
+
+    file_counts = [int(count) for count in args.files.split(",") if count.strip()]
+    params = {key: value for key, value in vars(args).items() if key not in ("files", "output")}
+    scenarios: list[dict[str, object]] = []
+
+    with tempfile.TemporaryDirectory(prefix="check-secrets-bench-") as scratch:
+        for files in file_counts:
+            scenarios.append(bench_scenario(args, files, Path(scratch)))
+
+    document = {
+        "benchmark": "check_secrets_hook",
+        "version": RESULTS_VERSION,
+        "environment": environment_info(),
+        "params": params,
+        "scenarios": scenarios,
+    }
+    text = json.dumps(document, indent=2, default=str) + "\n"
+    if args.output:
+        args.output.write_text(text)
+    else:
+        sys.stdout.write(text)
+
+
+if __name__ == "__main__":
+    main()
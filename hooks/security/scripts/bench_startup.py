@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Start-up benchmark for the check_secrets hook's non-commit path.
+
+The hook runs on every Bash tool call, and nearly all of them are not
+commits. This benchmark launches the hook the way Claude Code does, once per
+run, with a non-commit payload. It compares the results against a bare
+interpreter and a full import of the scanner:
+
+- wall-clock start-up (median and p95 of --runs launches)
+- module import time, read from ``python -X importtime``
+
+It exits with status 1 if the reject path exceeds its latency budget or
+imports any of the scanner's heavy modules, so it can run as a CI gate.
+
+Usage:
+    bench_startup.py [--runs N] [--budget-ms MS] [--import-budget-ms MS]
+
+Examples:
+    bench_startup.py
+    bench_startup.py --runs 50 --budget-ms 10
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SCRIPT: Path = Path(__file__).resolve().parent / "check_secrets_hook.py"
+
+# Hook input for an ordinary, non-commit Bash call
+REJECT_PAYLOAD: str = json.dumps({"tool_name": "Bash", "tool_input": {"command": "ls -la"}})
+
+# Modules that only the scan itself needs; the reject path must not load them
+DEFERRED_MODULES: tuple[str, ...] = (
+    "check_secrets",
+    "concurrent.futures",
+    "hashlib",
+    "json",
+    "pathlib",
+    "socket",
+    "sqlite3",
+    "subprocess",
+)
+
+# Median wall-clock cost over a bare interpreter. A call that does not mention
+# git is rejected without importing json, so the reject path costs a few ms
+DEFAULT_BUDGET_MS: float = 15.0
+DEFAULT_IMPORT_BUDGET_MS: float = 15.0  # Import time of modules beyond the interpreter's own
+
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    """Map each top-level import in ``-X importtime`` output to its cumulative microseconds."""
+    imports: dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented under their importer; only count the roots
+        if name.startswith(" ") and not name.startswith("  "):
+            imports[name.strip()] = int(cumulative)
+    return imports
+
+
+def import_profile(args: list[str], stdin: str = "") -> tuple[int, dict[str, int], set[str]]:
+    """Run python -X importtime with args; return (exit code, root imports, all modules)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        input=stdin,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    modules = {
+        line.rsplit("|", 1)[1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:") and "cumulative" not in line
+    }
+    return result.returncode, parse_importtime(result.stderr), modules
+
+
+def time_launch(args: list[str], stdin: str) -> float:
+    """Return the wall-clock seconds of one launch of python with args."""
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, *args],
+        input=stdin,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    return time.perf_counter() - start
+
+
+def time_launch_pairs(runs: int) -> tuple[list[float], list[float]]:
+    """Time runs launches of a bare interpreter and of the reject path, alternately.
+
+    Interleaving the two keeps machine load that drifts during the
+    benchmark from landing on only one of them.
+
+    Returns:
+        (bare interpreter timings, reject path timings), in seconds
+    """
+    bare: list[float] = []
+    reject: list[float] = []
+    for _ in range(runs):
+        bare.append(time_launch(["-c", "pass"], ""))
+        reject.append(time_launch([str(SCRIPT)], REJECT_PAYLOAD))
+    return bare, reject
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Return the value at fraction (0..1) of the sorted values."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main() -> None:
+    """Run the start-up benchmark and enforce the reject-path budget."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=20, help="launches per measurement")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=DEFAULT_BUDGET_MS,
+        help="allowed median start-up over a bare interpreter, in ms",
+    )
+    parser.add_argument(
+        "--import-budget-ms",
+        type=float,
+        default=DEFAULT_IMPORT_BUDGET_MS,
+        help="allowed import time beyond the interpreter's own, in ms",
+    )
+    args = parser.parse_args()
+
+    _, baseline_imports, baseline_modules = import_profile(["-c", "pass"])
+    exit_code, reject_imports, reject_modules = import_profile([str(SCRIPT)], REJECT_PAYLOAD)
+    _, full_imports, _ = import_profile(
+        ["-c", f"import sys; sys.path.insert(0, {str(SCRIPT.parent)!r}); import check_secrets"]
+    )
+    if exit_code != 0:
+        print(f"error: reject path exited with {exit_code}", file=sys.stderr)
+        sys.exit(1)
+
+    def extra_ms(imports: dict[str, int]) -> float:
+        return sum(
+            cumulative for name, cumulative in imports.items() if name not in baseline_imports
+        ) / 1000
+
+    reject_import_ms = extra_ms(reject_imports)
+    print("imports beyond a bare interpreter (python -X importtime)")
+    print(f"  {'reject path':<24} {reject_import_ms:8.1f} ms  "
+          f"{', '.join(sorted(set(reject_imports) - set(baseline_imports)))}")
+    print(f"  {'full scanner import':<24} {extra_ms(full_imports):8.1f} ms")
+
+    bare, reject = time_launch_pairs(args.runs)
+    # Each reject launch is compared with the bare launch just before it
+    overhead_ms = statistics.median(r - b for b, r in zip(bare, reject)) * 1000
+
+    print(f"\nstart-up, {args.runs} launches")
+    for name, timings in (("bare interpreter", bare), ("reject path", reject)):
+        print(
+            f"  {name:<24} p50 {statistics.median(timings) * 1000:7.1f} ms"
+            f"  p95 {percentile(timings, 0.95) * 1000:7.1f} ms"
+        )
+    print(f"  {'reject overhead (p50)':<24} {overhead_ms:7.1f} ms  budget {args.budget_ms:.1f} ms")
+
+    failures: list[str] = []
+    leaked = sorted(
+        module
+        for module in reject_modules - baseline_modules
+        if module.split(".")[0] in {name.split(".")[0] for name in DEFERRED_MODULES}
+    )
+    if leaked:
+        failures.append(f"reject path imports deferred modules: {', '.join(leaked)}")
+    if overhead_ms > args.budget_ms:
+        failures.append(f"reject overhead {overhead_ms:.1f} ms exceeds {args.budget_ms:.1f} ms")
+    if reject_import_ms > args.import_budget_ms:
+        failures.append(
+            f"reject imports take {reject_import_ms:.1f} ms, over {args.import_budget_ms:.1f} ms"
+        )
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
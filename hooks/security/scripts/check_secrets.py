@@ -2,23 +2,56 @@
 """
 Security hook to detect secrets in staged files before git commit.
 
-This hook runs as a PreToolUse hook on Bash commands containing "git commit".
-It scans staged files for hardcoded secrets, API keys, and .env values.
+This hook runs as a PreToolUse hook on Bash commands containing "git commit"
+or "git push". It scans staged files, and for pushes every blob changed by
+the commits being pushed, for hardcoded secrets, API keys, and .env values.
+The hook entry point is check_secrets_hook.py, which answers other calls
+without importing this module.
+
+When a scan daemon is running (``check_secrets.py --daemon``), the hook
+hands the scan to it over a Unix socket and falls back to scanning
+in-process if no daemon is available.
 
 Exit codes:
-    0 - No secrets detected, commit proceeds
-    2 - Secrets detected OR error occurred, commit blocked (fail-closed)
+    0 - No secrets detected, commit or push proceeds
+    2 - Secrets detected OR error occurred, commit or push blocked (fail-closed)
 """
 from __future__ import annotations
 
+import hashlib
+import heapq
+import importlib
+import io
 import json
+import marshal
 import os
 import re
+import shlex
+import socket
+import sqlite3
 import subprocess
 import sys
+import tempfile
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from collections.abc import Callable, Iterable, Iterator, Sequence, Sized
+from contextlib import redirect_stderr
+from fnmatch import fnmatchcase
 from enum import IntEnum
+from functools import lru_cache
+from itertools import chain, islice, repeat
+from math import log2
 from pathlib import Path
-from typing import TypedDict
+from types import ModuleType
+from typing import IO, TYPE_CHECKING, Any, NamedTuple, Protocol, TypeAlias, TypeVar
+
+# Hook input parsing lives in the entry point, which rejects non-commit calls
+# without importing this module
+from check_secrets_hook import is_git_commit_command, is_git_push_command, read_hook_command
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ProcessPoolExecutor
 
 
 class ExitCode(IntEnum):
@@ -28,23 +61,225 @@ class ExitCode(IntEnum):
     BLOCKED = 2
 
 
-class ToolInput(TypedDict, total=False):
-    """Type definition for tool input from Claude hooks."""
+class StagedFile(NamedTuple):
+    """A staged path, the object ID of its blob in the index, and git's binary verdict."""
+
+    path: str
+    object_id: str
+    binary: bool = False  # git diff --numstat reported "-" (content or attributes)
+
+
+class Finding(NamedTuple):
+    """A finding in one blob, independent of the path the blob is staged at."""
+
+    kind: str  # FINDING_PATTERN or FINDING_ENV
+    line: int
+    label: str  # Detector description or .env key
+
+
+class AddedBlock(NamedTuple):
+    """A run of consecutive added lines and the file line number of the first one."""
+
+    first_line: int
+    text: str
+
+
+class ScanTarget(NamedTuple):
+    """What one check covers: the staged changes, a range of commits, or both."""
+
+    staged: bool = True
+    revisions: list[str] | None = None  # git log revision arguments of a commit range
+
+
+class EnvFileStat(NamedTuple):
+    """A discovered env file (relative to the project root) and its stat signature."""
+
+    path: str
+    mtime_ns: int
+    size: int
+    inode: int  # Changes when an editor or deploy tool replaces the file
 
-    command: str
 
+class EnvSecrets(NamedTuple):
+    """Filtered .env values of a project and the automaton built over them.
 
-class HookInput(TypedDict, total=False):
-    """Type definition for hook input from stdin."""
+    Values are keyed by env label: the key alone for the root ``.env``, or
+    ``<file>=<key>`` for every other env file (see env_label()).
+    """
+
+    values: dict[str, str]
+    matcher: EnvValueMatcher
+
+
+class BlobHeader(NamedTuple):
+    """Header line returned by ``git cat-file --batch`` for one object."""
+
+    object_id: str
+    object_type: str
+    size: int
+
+
+class PathAttributes(NamedTuple):
+    """Paths whose staged .gitattributes affect the scan, from one check-attr call."""
+
+    binary: set[str]  # Marked ``binary`` or ``-diff``
+    excluded: set[str]  # Marked generated or vendored (EXCLUDE_ATTRIBUTES)
 
-    tool_name: str
-    tool_input: ToolInput | dict[str, object] | str | None
+
+# Content the scanners accept: decoded text, or raw bytes scanned without decoding
+ScanInput: TypeAlias = "str | bytes | bytearray"
+
+_T = TypeVar("_T")
+_K = TypeVar("_K", str, bytes)
 
 
 # Configuration
 MIN_SECRET_LENGTH: int = 8
-MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+MAX_FILE_SIZE: int = 10 * 1024 * 1024  # Larger blobs are streamed in windows, not read whole
 SUBPROCESS_TIMEOUT: int = 30  # 30 seconds
+BLOB_READ_CHUNK_SIZE: int = 64 * 1024  # 64KB
+BINARY_SNIFF_SIZE: int = 8000  # Bytes checked for NUL, as git's own binary detection does
+STREAM_WINDOW_SIZE: int = 4 * 1024 * 1024  # Bytes (or characters) reported per streaming window
+STREAM_CONTEXT: int = 64 * 1024  # Lookbehind/lookahead around each window; longest expected match
+NUMPY_LINE_INDEX_MIN_SIZE: int = 256 * 1024  # Use NumPy for line indexes above 256KB
+NUMPY_ENTROPY_MIN_TOKENS: int = 1024  # Smaller batches are cheaper in Python than importing NumPy
+
+# Entropy detector for high-entropy values assigned to credential-like names.
+# Thresholds are Shannon entropy in bits per character, by the value's character
+# class; override as "hex=3.5,base64=4.8", or set "off" to disable the detector
+ENTROPY_ENV_VAR: str = "CHECK_SECRETS_ENTROPY"
+ENTROPY_THRESHOLDS: dict[str, float] = {"hex": 3.0, "alnum": 4.0, "base64": 4.5}
+ENTROPY_MIN_LENGTH: int = 16  # Shorter values cannot carry enough entropy to judge
+# Values shaped like digests (MD5, SHA-1, SHA-2) or UUIDs are identifiers, not
+# credentials; every random hex string clears the hex threshold, so shape decides
+ENTROPY_DIGEST_HEX_LENGTHS: frozenset[int] = frozenset({32, 40, 56, 64, 96, 128})
+ENTROPY_UUID_PATTERN: re.Pattern[bytes] = re.compile(
+    rb'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'
+)
+
+# Regex engines a detector can be compiled with. "re" backtracks and is always
+# available; "regex" and "re2" (linear time) are used when installed
+REGEX_BACKEND_DEFAULT: str = "re"
+REGEX_BACKENDS: tuple[str, ...] = ("re", "regex", "re2")
+
+# User-defined detector packs, merged after the built-in detectors. The
+# user-level file defaults to $XDG_CONFIG_HOME/check-secrets/detectors.json
+DETECTORS_ENV_VAR: str = "CHECK_SECRETS_DETECTORS"  # Path of the user-level pack
+DETECTORS_FILE_NAME: str = ".check-secrets-detectors.json"  # Repo-level pack, at the project root
+DETECTORS_VERSION: int = 1  # Pack file format
+DETECTOR_ID_PATTERN: re.Pattern[str] = re.compile(r'[a-z0-9][a-z0-9._\-]*')
+DETECTOR_FIELDS: frozenset[str] = frozenset(
+    {"id", "pattern", "description", "literals", "backend", "ignore_case"}
+)
+DETECTOR_CACHE_MAX_ENTRIES: int = 16  # Validated pack sets kept on disk, e.g. one per worktree
+ENGINE_CACHE_MAX_ENTRIES: int = 8  # Compiled detector sets kept per process
+
+# Env files whose values are checked for. Globs without "/" match file names
+# at any depth, others match the path relative to the project root
+ENV_GLOBS_ENV_VAR: str = "CHECK_SECRETS_ENV_GLOBS"  # Comma-separated globs
+DEFAULT_ENV_GLOBS: tuple[str, ...] = (".env", ".env.*")
+ENV_TEMPLATE_SUFFIXES: tuple[str, ...] = (".example", ".sample", ".template", ".dist")  # Placeholders
+ENV_DISCOVERY_SKIP_DIRS: frozenset[str] = frozenset({
+    '.git', '.hg', '.svn', 'node_modules', '.venv', 'venv', '__pycache__', '.tox', '.mypy_cache',
+    '.pytest_cache', '.ruff_cache', '.cache', '.next', '.terraform', 'bower_components',
+    'vendor', 'dist', 'build', 'target', 'out',
+})
+ENV_ROOT_FILE: str = ".env"  # Its keys are reported without a file prefix
+ENV_LABEL_SEPARATOR: str = "="  # Cannot occur in a parsed key
+ENV_CACHE_VERSION: int = 1  # Bump when parsing, filtering or the matcher layout changes
+ENV_CACHE_MIN_BYTES: int = 4 * 1024  # Smaller env sets parse faster than the cache is located
+
+# Git file mode for submodule entries (gitlinks have no blob to read)
+GITLINK_MODE: str = "160000"
+
+# Finding kinds
+FINDING_PATTERN: str = "pattern"
+FINDING_ENV: str = "env"
+
+# Persistent scan-result cache (lives in the git common dir, shared by worktrees)
+CACHE_ENV_VAR: str = "CHECK_SECRETS_CACHE"
+CACHE_DIR_NAME: str = "check-secrets"
+CACHE_FILE_NAME: str = "scan-cache-v1.sqlite3"
+CACHE_MAX_ENTRIES: int = 50_000
+CACHE_BUSY_TIMEOUT: float = 5.0  # seconds to wait on a lock held by another hook
+CACHE_BATCH_SIZE: int = 500  # Stay under SQLite's bound-parameter limit
+SCAN_RESULTS_VERSION: int = 3  # Bump when scan semantics change to invalidate cached results
+
+# Parallel scanning: small commits stay inline, large ones fan out to worker processes
+WORKERS_ENV_VAR: str = "CHECK_SECRETS_WORKERS"
+PARALLEL_MIN_BYTES: int = 8 * 1024 * 1024  # Inline below 8MB; pool start-up would dominate
+PARALLEL_CHUNK_BYTES: int = 1024 * 1024  # Bytes of content per work unit
+PARALLEL_INFLIGHT_PER_WORKER: int = 2  # Bounds memory held by queued work units
+
+# Resident scan daemon: the hook becomes a thin client when one is listening
+DAEMON_ENV_VAR: str = "CHECK_SECRETS_DAEMON"
+DAEMON_SOCKET_ENV_VAR: str = "CHECK_SECRETS_DAEMON_SOCKET"
+DAEMON_PROTOCOL_VERSION: int = 2
+DAEMON_CONNECT_TIMEOUT: float = 1.0
+DAEMON_RESPONSE_TIMEOUT: float = 25.0  # Leaves the hook time to report before its 30s limit
+DAEMON_READ_TIMEOUT: float = 2.0  # A client that stalls mid-request is dropped
+DAEMON_IDLE_TIMEOUT: float = 3600.0  # Exit after an hour without requests
+DAEMON_POLL_INTERVAL: float = 1.0
+DAEMON_MAX_MESSAGE_SIZE: int = 1024 * 1024
+DAEMON_MAX_CHILDREN: int = 32  # Concurrent scans; further requests wait for a slot
+DAEMON_MAX_PROJECTS: int = 64  # Projects whose .env state is kept warm
+DAEMON_FORWARDED_ENV_PREFIXES: tuple[str, ...] = ("CHECK_SECRETS_", "GIT_")
+
+# History audits (check_secrets.py --history): every reachable blob, each scanned once
+HISTORY_FLAG: str = "--history"
+HISTORY_MAX_INTRODUCTIONS: int = 5  # Introducing commits listed per flagged blob
+HISTORY_PROGRESS_INTERVAL: float = 5.0  # Seconds between progress lines on a terminal
+HISTORY_RESTART_FLAG: str = "--restart"  # Discard the checkpoint journal instead of resuming
+JOURNAL_FLUSH_INTERVAL: float = 2.0  # Seconds between checkpoint commits
+JOURNAL_FLUSH_ENTRIES: int = 5000  # Completed blobs buffered before a checkpoint commit
+BASELINE_FLAG: str = "--baseline"  # Followed by the baseline file of accepted findings
+BASELINE_UPDATE_FLAG: str = "--update-baseline"  # Accept this run's findings into the baseline
+BASELINE_VERSION: int = 1  # Bump when the baseline file layout changes
+
+# Opt-in phase profiling: "1" writes a JSON record per run, "trace" adds a Chrome trace
+PROFILE_ENV_VAR: str = "CHECK_SECRETS_PROFILE"
+PROFILE_FILE_NAME: str = "profile.jsonl"  # One record appended per profiled run
+PROFILE_TRACE_FILE_NAME: str = "trace.json"  # Chrome trace of the latest profiled run
+PROFILE_VERSION: int = 1
+PROFILE_MAX_TRACE_EVENTS: int = 100_000  # Per-call events beyond this are only aggregated
+
+# Commit range scans: "check_secrets.py --range <base>..<head>", and the hook on git push
+RANGE_FLAG: str = "--range"
+RANGE_REVISION_OPTIONS: frozenset[str] = frozenset({"--not", "--all", "--branches", "--tags", "--remotes"})
+PUSH_UNPUSHED: tuple[str, ...] = ("--not", "--remotes")  # Pushed commits are those no remote has yet
+GIT_VALUE_OPTIONS: frozenset[str] = frozenset({"-C", "-c", "--git-dir", "--work-tree", "--namespace"})
+PUSH_VALUE_OPTIONS: frozenset[str] = frozenset({"-o", "--push-option", "--repo", "--receive-pack", "--exec"})
+SHELL_SEPARATORS: frozenset[str] = frozenset({"&&", "||", ";", "|", "&", "(", ")"})
+
+# Bounds on bad commits: stop at the first finding, and cap what is reported.
+# A cap of 0 reports everything
+FAIL_FAST_ENV_VAR: str = "CHECK_SECRETS_FAIL_FAST"
+MAX_FINDINGS_PER_FILE_ENV_VAR: str = "CHECK_SECRETS_MAX_FINDINGS_PER_FILE"
+MAX_FINDINGS_ENV_VAR: str = "CHECK_SECRETS_MAX_FINDINGS"
+DEFAULT_MAX_FINDINGS_PER_FILE: int = 20
+DEFAULT_MAX_FINDINGS: int = 100
+
+# Paths left out of every scan: gitignore-style patterns in a file at the
+# project root, and paths .gitattributes marks as generated or vendored
+SECRETS_IGNORE_FILE_NAME: str = ".secretsignore"
+EXCLUDE_ATTRIBUTES: tuple[str, ...] = ("linguist-generated", "linguist-vendored")
+EXCLUDE_ATTRIBUTE_VALUES: frozenset[str] = frozenset({"set", "true"})  # check-attr spellings of "on"
+
+# Scan modes: whole staged blobs (default) or only the lines a commit adds
+SCAN_MODE_ENV_VAR: str = "CHECK_SECRETS_SCAN_MODE"
+SCAN_MODE_FULL: str = "full"
+SCAN_MODE_DIFF: str = "diff"
+SCAN_MODES: frozenset[str] = frozenset({SCAN_MODE_FULL, SCAN_MODE_DIFF})
+
+# Unified diff hunk header: "@@ -<old>[,<count>] +<new>[,<count>] @@"
+HUNK_HEADER_PATTERN: re.Pattern[bytes] = re.compile(
+    rb'^@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))? @@'
+)
+
+# C-style escapes git uses in quoted paths
+_GIT_PATH_ESCAPES: dict[str, int] = {
+    'a': 7, 'b': 8, 't': 9, 'n': 10, 'v': 11, 'f': 12, 'r': 13, '"': 34, '\\': 92,
+}
 
 # Common non-secret values to skip
 SKIP_VALUES: frozenset[str] = frozenset({
@@ -69,43 +304,449 @@ ENV_FILE_NAMES: frozenset[str] = frozenset({
     '.env.test', '.env.staging', '.env.example',
 })
 
+# Byte translation table for ASCII-only lowercasing (offsets never change)
+ASCII_LOWERCASE: bytes = bytes.maketrans(
+    b'ABCDEFGHIJKLMNOPQRSTUVWXYZ', b'abcdefghijklmnopqrstuvwxyz'
+)
+
+
+def translate_buffer(content: bytes | bytearray, table: bytes) -> bytes:
+    """Map every byte of content through a 256-byte table."""
+    return bytes(content.translate(table))
+
+
+class Detector(NamedTuple):
+    """A secret detector and the literal prefixes every one of its matches starts with.
+
+    Prefixes double as required literals: a blob containing none of them
+    cannot match. They are compared case-insensitively when the pattern is
+    ``(?i)``; a detector with no prefixes is scanned with its own full pass.
+    Such a detector can still list ``required`` literals that occur
+    anywhere in its matches: the full pass is skipped for blobs holding
+    none of them.
+
+    The pattern is always compiled with ``re`` as its canonical form; the
+    scan engine recompiles it with the detector's backend (see
+    compile_detector_pattern()).
+    """
+
+    pattern: re.Pattern[str]
+    description: str
+    prefixes: tuple[str, ...]
+    backend: str = REGEX_BACKEND_DEFAULT  # One of REGEX_BACKENDS
+    id: str = ""  # Set for detectors from packs; repo packs override user packs by id
+    required: tuple[str, ...] = ()  # Literals every match contains, at any position
+
+
+class CompiledPattern(Protocol):
+    """The part of a compiled pattern the scan engine uses, in any regex backend."""
+
+    def match(self, string: Any, pos: int = ...) -> Any: ...
+
+    def finditer(self, string: Any) -> Iterator[Any]: ...
+
+
+# RE2 has no flags argument; flags are passed inline instead
+_RE2_INLINE_FLAGS: tuple[tuple[int, str], ...] = (
+    (re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"),
+)
+
+
+class _RE2TextPattern:
+    """Match text with a bytes-compiled RE2 pattern, encoding each text once.
+
+    RE2 works on UTF-8 and its Python binding re-encodes text on every call,
+    which the engine's per-anchor ``match`` calls would repeat for the whole
+    blob. ASCII text is encoded once and matched as bytes, where offsets
+    equal character offsets; other text is matched with ``re``.
+    """
+
+    def __init__(self, pattern: CompiledPattern, fallback: re.Pattern[str]) -> None:
+        self._pattern = pattern
+        self._fallback = fallback
+        self._text: str | None = None
+        self._encoded: bytes | None = None
+
+    def _target(self, text: str) -> bytes | None:
+        if text is not self._text:
+            self._text = text
+            self._encoded = text.encode('ascii') if text.isascii() else None
+        return self._encoded
+
+    def match(self, string: str, pos: int = 0) -> Any:
+        encoded = self._target(string)
+        if encoded is None:
+            return self._fallback.match(string, pos)
+        return self._pattern.match(encoded, pos)
+
+    def finditer(self, string: str) -> Iterator[Any]:
+        encoded = self._target(string)
+        if encoded is None:
+            return self._fallback.finditer(string)
+        return self._pattern.finditer(encoded)
+
+
+@lru_cache(maxsize=None)
+def load_regex_backend(name: str) -> ModuleType | None:
+    """Import a regex backend's module, or return None if it is unknown or not installed."""
+    if name == "re":
+        return re
+    if name not in REGEX_BACKENDS:
+        return None
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+def compile_detector_pattern(detector: Detector, binary: bool = False) -> CompiledPattern:
+    """Compile a detector's pattern with its regex backend, for text or for bytes.
+
+    Falls back to ``re`` with a warning if the backend is not installed or
+    does not support the pattern (RE2 has no backreferences or lookaround).
+    """
+    flags = detector.pattern.flags & ~re.UNICODE if binary else detector.pattern.flags
+    source: str | bytes = detector.pattern.pattern.encode('utf-8') if binary else detector.pattern.pattern
+    if detector.backend == "re":
+        return re.compile(source, flags)
+
+    module = load_regex_backend(detector.backend)
+    if module is None:
+        print(f"Warning: Regex backend {detector.backend!r} is not available for "
+              f"{detector.description!r}; using re", file=sys.stderr)
+        return re.compile(source, flags)
+
+    try:
+        if detector.backend == "re2":
+            inline = "".join(letter for flag, letter in _RE2_INLINE_FLAGS if flags & flag)
+            prefix = f"(?{inline})" if inline else ""
+            pattern = module.compile(prefix.encode() + detector.pattern.pattern.encode('utf-8'))
+            return pattern if binary else _RE2TextPattern(pattern, re.compile(source, flags))
+        return module.compile(source, flags)
+    except Exception as e:  # noqa: BLE001 - each backend raises its own error type
+        print(f"Warning: Regex backend {detector.backend!r} cannot compile "
+              f"{detector.description!r} ({e}); using re", file=sys.stderr)
+        return re.compile(source, flags)
+
+
 # Pre-compiled secret patterns to detect (compiled once at module load)
-SECRET_PATTERNS: list[tuple[re.Pattern[str], str]] = [
+SECRET_PATTERNS: list[Detector] = [
     # Generic secrets
-    (re.compile(r'(?i)(secret|token)\s*[:=]\s*[\'"]?[a-zA-Z0-9_\-]{20,}'), "secret/token"),
+    Detector(
+        re.compile(r'(?i)(secret|token)\s*[:=]\s*[\'"]?[a-zA-Z0-9_\-]{20,}'),
+        "secret/token",
+        ("secret", "token"),
+    ),
     # AWS
-    (re.compile(r'(?i)(aws_access_key_id|aws_secret_access_key)\s*[:=]'), "AWS credentials"),
-    (re.compile(r'AKIA[0-9A-Z]{16}'), "AWS Access Key ID"),
+    Detector(
+        re.compile(r'(?i)(aws_access_key_id|aws_secret_access_key)\s*[:=]'),
+        "AWS credentials",
+        ("aws_access_key_id", "aws_secret_access_key"),
+    ),
+    Detector(re.compile(r'AKIA[0-9A-Z]{16}'), "AWS Access Key ID", ("AKIA",)),
     # OpenAI
-    (re.compile(r'sk-[a-zA-Z0-9]{20,}'), "OpenAI API key"),
-    (re.compile(r'sk-proj-[a-zA-Z0-9]{20,}'), "OpenAI project API key"),
+    Detector(re.compile(r'sk-[a-zA-Z0-9]{20,}'), "OpenAI API key", ("sk-",)),
+    Detector(re.compile(r'sk-proj-[a-zA-Z0-9]{20,}'), "OpenAI project API key", ("sk-proj-",)),
     # Google
-    (re.compile(r'AIza[0-9A-Za-z\-_]{35}'), "Google API key"),
+    Detector(re.compile(r'AIza[0-9A-Za-z\-_]{35}'), "Google API key", ("AIza",)),
     # GitHub
-    (re.compile(r'ghp_[a-zA-Z0-9]{36}'), "GitHub Personal Access Token"),
-    (re.compile(r'gho_[a-zA-Z0-9]{36}'), "GitHub OAuth Token"),
-    (re.compile(r'ghu_[a-zA-Z0-9]{36}'), "GitHub User Token"),
-    (re.compile(r'ghs_[a-zA-Z0-9]{36}'), "GitHub Server Token"),
-    (re.compile(r'ghr_[a-zA-Z0-9]{36}'), "GitHub Refresh Token"),
+    Detector(re.compile(r'ghp_[a-zA-Z0-9]{36}'), "GitHub Personal Access Token", ("ghp_",)),
+    Detector(re.compile(r'gho_[a-zA-Z0-9]{36}'), "GitHub OAuth Token", ("gho_",)),
+    Detector(re.compile(r'ghu_[a-zA-Z0-9]{36}'), "GitHub User Token", ("ghu_",)),
+    Detector(re.compile(r'ghs_[a-zA-Z0-9]{36}'), "GitHub Server Token", ("ghs_",)),
+    Detector(re.compile(r'ghr_[a-zA-Z0-9]{36}'), "GitHub Refresh Token", ("ghr_",)),
     # Bearer tokens
-    (re.compile(r'(?i)bearer\s+[a-zA-Z0-9_\-\.]{20,}'), "Bearer token"),
+    Detector(re.compile(r'(?i)bearer\s+[a-zA-Z0-9_\-\.]{20,}'), "Bearer token", ("bearer",)),
     # Private keys
-    (re.compile(r'-----BEGIN (RSA |DSA |EC |OPENSSH )?PRIVATE KEY-----'), "Private key"),
+    Detector(
+        re.compile(r'-----BEGIN (RSA |DSA |EC |OPENSSH )?PRIVATE KEY-----'),
+        "Private key",
+        ("-----BEGIN ",),
+    ),
     # Slack
-    (re.compile(r'xox[baprs]-[a-zA-Z0-9\-]{10,}'), "Slack token"),
+    Detector(re.compile(r'xox[baprs]-[a-zA-Z0-9\-]{10,}'), "Slack token", ("xox",)),
     # Stripe
-    (re.compile(r'sk_live_[a-zA-Z0-9]{24,}'), "Stripe secret key"),
-    (re.compile(r'rk_live_[a-zA-Z0-9]{24,}'), "Stripe restricted key"),
+    Detector(re.compile(r'sk_live_[a-zA-Z0-9]{24,}'), "Stripe secret key", ("sk_live_",)),
+    Detector(re.compile(r'rk_live_[a-zA-Z0-9]{24,}'), "Stripe restricted key", ("rk_live_",)),
     # SendGrid
-    (re.compile(r'SG\.[a-zA-Z0-9_\-]{20,}\.[a-zA-Z0-9_\-]{20,}'), "SendGrid API key"),
+    Detector(
+        re.compile(r'SG\.[a-zA-Z0-9_\-]{20,}\.[a-zA-Z0-9_\-]{20,}'),
+        "SendGrid API key",
+        ("SG.",),
+    ),
     # Database connection strings
-    (re.compile(r'mongodb(\+srv)?://[^:]+:[^@\s]+@'), "MongoDB connection string"),
-    (re.compile(r'postgres(ql)?://[^:]+:[^@\s]+@'), "PostgreSQL connection string"),
-    (re.compile(r'mysql://[^:]+:[^@\s]+@'), "MySQL connection string"),
+    Detector(re.compile(r'mongodb(\+srv)?://[^:]+:[^@\s]+@'), "MongoDB connection string", ("mongodb",)),
+    Detector(re.compile(r'postgres(ql)?://[^:]+:[^@\s]+@'), "PostgreSQL connection string", ("postgres",)),
+    Detector(re.compile(r'mysql://[^:]+:[^@\s]+@'), "MySQL connection string", ("mysql://",)),
     # Anthropic
-    (re.compile(r'sk-ant-[a-zA-Z0-9\-]{20,}'), "Anthropic API key"),
+    Detector(re.compile(r'sk-ant-[a-zA-Z0-9\-]{20,}'), "Anthropic API key", ("sk-ant-",)),
 ]
 
+# Values assigned to credential-like names (api_key, password, client_credential...).
+# Matches are only candidates: select_high_entropy() keeps those whose value
+# looks random, so this detector is scanned with the others but never reported
+# under its own description.
+#
+# The name word must be a whole part of the identifier: it starts the name,
+# follows a separator, or starts a camelCase word (apiKey), and no lowercase
+# letter follows it (nor a capital, after an all-caps word), so keyboard_layout,
+# monkey and KEYBOARD are not credential names. The pattern is ASCII-only:
+# under Unicode case folding "K" (the Kelvin sign) would match "k", and
+# select_high_entropy() expects ASCII values.
+ENTROPY_CANDIDATE: Detector = Detector(
+    re.compile(
+        r'(?i)(?:(?<![a-z0-9])|(?-i:(?<=[a-z0-9])(?=[A-Z])))'
+        r'(?:keys?|pass(?:word|wd|phrase)?s?|pwd|secrets?|tokens?|credentials?'
+        r'|auth(?:entication|orization)?)'
+        r'(?-i:(?![a-z])(?:(?<![A-Z]{2})|(?![A-Z])))'
+        r'[\w.\-]{0,40}[\'"]?[ \t]*'
+        r'(?::=|=>|[:=])[ \t]*[\'"`]?([a-zA-Z0-9+/=_\-]{%d,})' % ENTROPY_MIN_LENGTH,
+        re.ASCII,
+    ),
+    "high-entropy value",
+    ("key", "pass", "pwd", "secret", "token", "credential", "auth"),
+)
+
+
+class ScanEngine:
+    """Single-pass matcher for a set of detectors.
+
+    Before any regex runs, each detector's required literals are checked with
+    a plain substring search, and blobs containing none of them are skipped.
+    The literals that are present are compiled into one alternation that
+    walks the content once. Each hit is dispatched to the detectors owning
+    that prefix (or a shorter prefix of it), which are then matched in place.
+    This finds overlapping matches from different detectors (e.g. ``sk-`` and
+    ``sk-ant-``) and yields exactly what a separate ``finditer`` pass per
+    detector would.
+
+    Python's ``re`` only skips ahead with a fast literal search when the
+    alternation is plain literals, so detectors are identified from the
+    matched prefix rather than from named groups. The anchor is always
+    ``re``; each detector is then matched with its own regex backend.
+
+    Raw bytes are scanned with bytes-compiled copies of the detectors, so
+    blobs never need decoding. ASCII lowercasing of bytes preserves offsets
+    for any content, which keeps the fast case-sensitive anchor even for
+    files that are not pure ASCII. Byte anchor keys are lowered the same
+    way, so prefixes with non-ASCII letters still match.
+
+    Detectors without prefixes get a full ``finditer`` pass, skipped when
+    they list ``required`` literals and none occurs in the content.
+    """
+
+    def __init__(self, detectors: list[Detector], prefilter: bool = True) -> None:
+        self.detectors = detectors
+        self.prefilter = prefilter
+        self._unanchored: list[int] = [
+            index for index, detector in enumerate(detectors) if not detector.prefixes
+        ]
+        self._anchored: tuple[int, ...] = tuple(
+            index for index, detector in enumerate(detectors) if detector.prefixes
+        )
+        # Detector patterns compiled with each detector's backend; anchors stay on re
+        self._text_patterns: list[CompiledPattern] = [
+            compile_detector_pattern(detector) for detector in detectors
+        ]
+        self._byte_patterns: list[CompiledPattern] = [
+            compile_detector_pattern(detector, binary=True) for detector in detectors
+        ]
+
+        # Text keys are lowered like re's case folding; byte keys like the
+        # ASCII-lowered haystack they are searched in
+        owners: dict[str, set[int]] = {}
+        byte_owners: dict[bytes, set[int]] = {}
+        literals: dict[tuple[str, bool], str] = {}
+        byte_literals: dict[tuple[bytes, bool], bytes] = {}
+        for index, detector in enumerate(detectors):
+            ignorecase = bool(detector.pattern.flags & re.IGNORECASE)
+            for prefix in detector.prefixes:
+                key = prefix.lower()
+                owners.setdefault(key, set()).add(index)
+                literals[(key if ignorecase else prefix, ignorecase)] = key
+                encoded = prefix.encode('utf-8')
+                byte_key = encoded.translate(ASCII_LOWERCASE)
+                byte_owners.setdefault(byte_key, set()).add(index)
+                byte_literals[(byte_key if ignorecase else encoded, ignorecase)] = byte_key
+
+        # Presence checks: (literal, compare against lowered content, anchor key)
+        self._literals: list[tuple[str, bool, str]] = [
+            (literal, ignorecase, key) for (literal, ignorecase), key in literals.items()
+        ]
+        self._byte_literals: list[tuple[bytes, bool, bytes]] = [
+            (literal, ignorecase, key) for (literal, ignorecase), key in byte_literals.items()
+        ]
+
+        # A hit on "sk-ant-" must also try detectors anchored on "sk-"
+        self._dispatch: dict[str, tuple[int, ...]] = self._dispatch_table(owners)
+        self._byte_dispatch: dict[bytes, tuple[int, ...]] = self._dispatch_table(byte_owners)
+
+        self._all_keys: frozenset[str] = frozenset(owners)
+        self._all_byte_keys: frozenset[bytes] = frozenset(byte_owners)
+        self._anchor = lru_cache(maxsize=256)(self._compile_anchor)
+
+    @staticmethod
+    def _dispatch_table(owners: dict[_K, set[int]]) -> dict[_K, tuple[int, ...]]:
+        return {
+            key: tuple(sorted({
+                index
+                for prefix, indexes in owners.items() if key.startswith(prefix)
+                for index in indexes
+            }))
+            for key in owners
+        }
+
+    @staticmethod
+    def _compile_anchor(
+        keys: frozenset[str] | frozenset[bytes], ignorecase: bool
+    ) -> re.Pattern[str] | re.Pattern[bytes]:
+        # Longest first so the alternation reports the most specific prefix
+        ordered = sorted(keys, key=lambda key: (-len(key), key))
+        if ordered and isinstance(ordered[0], bytes):
+            return re.compile(b'|'.join(re.escape(key) for key in ordered))
+        return re.compile('|'.join(re.escape(key) for key in ordered), re.IGNORECASE if ignorecase else 0)
+
+    def present_keys(
+        self, content: ScanInput, lowered: str | bytes
+    ) -> frozenset[str] | frozenset[bytes]:
+        """Return the anchor keys whose required literal occurs in content.
+
+        Text must be ASCII, and yields text keys; bytes of any encoding are
+        accepted, and yield byte keys.
+        """
+        if isinstance(content, str):
+            return frozenset(
+                key
+                for literal, ignorecase, key in self._literals
+                if literal in (lowered if ignorecase else content)
+            )
+        return frozenset(
+            key
+            for literal, ignorecase, key in self._byte_literals
+            if literal in (lowered if ignorecase else content)
+        )
+
+    def scan(
+        self, content: ScanInput, limit: int = 0
+    ) -> list[tuple[Detector, re.Match[str] | re.Match[bytes]]]:
+        """Return every detector match in content, ordered by detector then position.
+
+        Text yields character offsets; bytes and bytearrays are scanned in
+        place and yield byte offsets.
+
+        Args:
+            content: Text or raw bytes to scan
+            limit: Return only the first limit matches by position, and stop
+                scanning once they are found (0 for all)
+        """
+        streams = self._hit_streams(content)
+        if limit:
+            hits = list(islice(heapq.merge(*streams, key=lambda hit: hit[1].start()), limit))
+        else:
+            hits = list(chain.from_iterable(streams))
+        hits.sort(key=lambda hit: (hit[0], hit[1].start()))
+        return [(self.detectors[index], match) for index, match in hits]
+
+    def iter_hits(self, content: ScanInput) -> Iterator[tuple[Detector, re.Match[str] | re.Match[bytes]]]:
+        """Yield every detector match in content, ordered by position.
+
+        Matches are found lazily, so a caller that stops early does not pay
+        for the rest of the content.
+        """
+        for index, match in heapq.merge(*self._hit_streams(content), key=lambda hit: hit[1].start()):
+            yield self.detectors[index], match
+
+    def _hit_streams(self, content: ScanInput) -> list[Iterator[tuple[int, Any]]]:
+        """Return lazy (detector index, match) streams, each ordered by position.
+
+        There is one stream per unanchored detector that may match, and one
+        for the anchor walk over all anchored detectors.
+        """
+        binary = not isinstance(content, str)
+        patterns = self._byte_patterns if binary else self._text_patterns
+        streams: list[Iterator[tuple[int, Any]]] = []
+
+        lowered: str | bytes | None = None
+        for index in self._unanchored:
+            required = self.detectors[index].required
+            if required and self.prefilter:
+                if lowered is None:
+                    lowered = (translate_buffer(content, ASCII_LOWERCASE) if binary
+                               else content.lower() if content.isascii() else "")
+                if not self._contains_required(index, content, lowered):
+                    continue
+            streams.append(zip(repeat(index), patterns[index].finditer(content)))
+
+        if self._all_keys:
+            streams.append(self._anchored_hits(content, patterns, lowered))
+        return streams
+
+    def _anchored_hits(
+        self, content: ScanInput, patterns: list[CompiledPattern], lowered: str | bytes | None
+    ) -> Iterator[tuple[int, Any]]:
+        """Walk the anchor alternation over content and match each hit's detectors in place."""
+        binary = not isinstance(content, str)
+        # ASCII lowercasing preserves positions; other text uses re's own case folding
+        if binary:
+            haystack = translate_buffer(content, ASCII_LOWERCASE) if lowered is None else lowered
+            keys = self.present_keys(content, haystack) if self.prefilter else self._all_byte_keys
+            anchor = self._anchor(keys, False) if keys else None
+        elif content.isascii():
+            haystack = content.lower()
+            keys = self.present_keys(content, haystack) if self.prefilter else self._all_keys
+            anchor = self._anchor(keys, False) if keys else None
+        else:
+            haystack = content
+            anchor = self._anchor(self._all_keys, True)
+
+        # Per-detector resume position mirrors finditer's non-overlapping semantics
+        resume_at: dict[int, int] = {}
+        position = 0
+        while anchor is not None and (hit := anchor.search(haystack, position)) is not None:
+            start = hit.start()
+            prefix = hit.group()
+            candidates = (self._byte_dispatch.get(prefix, self._anchored) if binary
+                          else self._dispatch.get(prefix.lower(), self._anchored))
+            for index in candidates:
+                if start < resume_at.get(index, 0):
+                    continue
+                match = patterns[index].match(content, start)
+                if match is not None:
+                    yield index, match
+                    resume_at[index] = max(match.end(), start + 1)
+            position = start + 1
+
+    def _contains_required(self, index: int, content: ScanInput, lowered: str | bytes) -> bool:
+        """Check if content holds one of the required literals of an unanchored detector.
+
+        lowered is content lowered like the anchor haystack, or "" for
+        non-ASCII text, whose case folding only the regex itself gets right.
+        """
+        detector = self.detectors[index]
+        ignorecase = bool(detector.pattern.flags & re.IGNORECASE)
+        if ignorecase and not lowered:
+            return True
+        for literal in detector.required:
+            if isinstance(lowered, bytes):
+                needle = literal.encode('utf-8')
+                if (lowered.find(needle.translate(ASCII_LOWERCASE)) if ignorecase
+                        else content.find(needle)) != -1:
+                    return True
+            elif (literal.lower() in lowered) if ignorecase else (literal in content):
+                return True
+        return False
+
+
+# Built-in detectors; the entropy candidate stays last so its findings follow
+# those of every named detector, including ones from packs
+DEFAULT_DETECTORS: list[Detector] = [*SECRET_PATTERNS, ENTROPY_CANDIDATE]
+SCAN_ENGINE: ScanEngine = ScanEngine(DEFAULT_DETECTORS)
+
+# Compiled engines by detector set, least recently used first. A warm process
+# (the scan daemon, and the children and pool workers it forks) compiles each
+# set once
+_engine_cache: dict[tuple[Detector, ...], ScanEngine] = {tuple(DEFAULT_DETECTORS): SCAN_ENGINE}
+
 
 def parse_env_file(env_path: Path) -> dict[str, str]:
     """Parse a .env file and return a dictionary of key-value pairs."""
@@ -163,12 +804,303 @@ def filter_env_values(env_vars: dict[str, str]) -> dict[str, str]:
     return filtered
 
 
+def get_env_globs(environ: dict[str, str] | None = None) -> tuple[str, ...]:
+    """Return the env file globs from ENV_GLOBS_ENV_VAR, or DEFAULT_ENV_GLOBS.
+
+    Args:
+        environ: Environment to read (a daemon client's), or None for os.environ
+    """
+    configured = (os.environ if environ is None else environ).get(ENV_GLOBS_ENV_VAR, "")
+    globs = tuple(glob.strip() for glob in configured.split(",") if glob.strip())
+    return globs or DEFAULT_ENV_GLOBS
+
+
+def matches_env_glob(path: str, globs: Iterable[str]) -> bool:
+    """Check if a relative POSIX path matches any env file glob."""
+    name = path.rsplit("/", 1)[-1]
+    return any(fnmatchcase(path if "/" in glob else name, glob) for glob in globs)
+
+
+def discover_env_files(project_root: Path, globs: tuple[str, ...]) -> list[EnvFileStat]:
+    """Find the env files under project_root that match globs, sorted by path.
+
+    Template files (``.env.example`` and the like) hold placeholders, not
+    secrets, and are left out. Directories in ENV_DISCOVERY_SKIP_DIRS,
+    nested repositories and symlinked directories are not descended into.
+    """
+    top = os.fspath(project_root)
+    found: list[EnvFileStat] = []
+    for directory, subdirectories, file_names in os.walk(top):
+        # A nested repository or submodule has env files of its own
+        if directory != top and (".git" in subdirectories or ".git" in file_names):
+            subdirectories.clear()
+            continue
+        subdirectories[:] = [name for name in subdirectories if name not in ENV_DISCOVERY_SKIP_DIRS]
+        relative_dir = os.path.relpath(directory, top).replace(os.sep, "/")
+        prefix = "" if relative_dir == "." else f"{relative_dir}/"
+        for name in file_names:
+            path = prefix + name
+            if name.endswith(ENV_TEMPLATE_SUFFIXES) or not matches_env_glob(path, globs):
+                continue
+            try:
+                stat = os.stat(os.path.join(directory, name))
+            except OSError:
+                continue
+            found.append(EnvFileStat(path, stat.st_mtime_ns, stat.st_size, stat.st_ino))
+    found.sort()
+    return found
+
+
+def env_label(source: str, key: str) -> str:
+    """Return the label findings of key from the env file source are reported under."""
+    return key if source == ENV_ROOT_FILE else f"{source}{ENV_LABEL_SEPARATOR}{key}"
+
+
+def split_env_label(label: str) -> tuple[str, str]:
+    """Split an env label into (env file, key)."""
+    source, _, key = label.rpartition(ENV_LABEL_SEPARATOR)
+    return source or ENV_ROOT_FILE, key
+
+
+def load_env_values(project_root: Path, env_files: Iterable[EnvFileStat]) -> dict[str, str]:
+    """Parse, filter and merge the values of env_files, keyed by env label.
+
+    A value defined in several files is kept once, under the first file (in
+    path order) that defines it, so each occurrence is reported once.
+    """
+    merged: dict[str, str] = {}
+    seen: set[str] = set()
+    for env_file in env_files:
+        values = filter_env_values(parse_env_file(project_root / env_file.path))
+        for key, value in values.items():
+            if value not in seen:
+                seen.add(value)
+                merged[env_label(env_file.path, key)] = value
+    return merged
+
+
+def _is_word_char(char: str) -> bool:
+    """Match the definition of a word character used by re's ``\\b``."""
+    return char.isalnum() or char == '_'
+
+
+def _is_word_at(content: ScanInput, index: int, before: bool) -> bool:
+    """Apply _is_word_char() to the character at content[index].
+
+    For bytes, this is the UTF-8 character starting at index, or ending at it
+    when before is set. ASCII bytes are classified directly; only a
+    multi-byte neighbour is decoded, and undecodable bytes count as non-word
+    characters.
+    """
+    if isinstance(content, str):
+        return _is_word_char(content[index])
+
+    byte = content[index]
+    if byte < 0x80:
+        return _is_word_char(chr(byte))
+
+    if before:
+        start = index
+        while start > max(0, index - 3) and 0x80 <= content[start] < 0xC0:
+            start -= 1
+        text = bytes(content[start:index + 1]).decode('utf-8', errors='replace')
+        return _is_word_char(text[-1])
+
+    text = bytes(content[index:index + 4]).decode('utf-8', errors='replace')
+    return _is_word_char(text[0])
+
+
+class _ValueAutomaton:
+    """Aho-Corasick DFA over a list of symbol sequences (characters or bytes)."""
+
+    def __init__(self, values: list[str] | list[bytes]) -> None:
+        self.lengths: list[int] = [len(value) for value in values]
+
+        # Symbol classes: 0 is "not in any value"
+        alphabet = sorted({symbol for value in values for symbol in value})
+        self.classes: dict[str | int, int] = {symbol: index + 1 for index, symbol in enumerate(alphabet)}
+        width = len(alphabet) + 1
+        self.narrow: bool = width <= 256
+
+        # Trie of all values
+        goto: list[dict[int, int]] = [{}]
+        outputs: list[tuple[int, ...]] = [()]
+        for key_index, value in enumerate(values):
+            state = 0
+            for symbol in value:
+                symbol_class = self.classes[symbol]
+                next_state = goto[state].get(symbol_class)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto.append({})
+                    outputs.append(())
+                    goto[state][symbol_class] = next_state
+                state = next_state
+            outputs[state] += (key_index,)
+
+        # Failure links resolved into full transition rows, breadth first
+        rows: list[list[int]] = [[] for _ in goto]
+        rows[0] = [goto[0].get(symbol_class, 0) for symbol_class in range(width)]
+        fail = [0] * len(goto)
+        queue: deque[int] = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            row = list(rows[fail[state]])
+            for symbol_class, next_state in goto[state].items():
+                fail[next_state] = rows[fail[state]][symbol_class]
+                outputs[next_state] += outputs[fail[next_state]]
+                row[symbol_class] = next_state
+                queue.append(next_state)
+            rows[state] = row
+
+        # Renumber so accepting states come last, and pre-scale ids by the row width
+        order = [state for state in range(len(goto)) if not outputs[state]]
+        self.accepting_from: int = len(order) * width
+        order += [state for state in range(len(goto)) if outputs[state]]
+        scaled = [0] * len(goto)
+        for new_id, state in enumerate(order):
+            scaled[state] = new_id * width
+
+        self.transitions: list[int] = [
+            scaled[next_state] for state in order for next_state in rows[state]
+        ]
+        self.outputs: dict[int, tuple[int, ...]] = {
+            scaled[state]: outputs[state] for state in order if outputs[state]
+        }
+
+        # Byte automata classify content with one bytes.translate() call
+        self.byte_table: bytes | None = None
+        if values and isinstance(values[0], bytes):
+            self.byte_table = bytes(self.classes.get(byte, 0) for byte in range(256))
+
+    @classmethod
+    def from_state(cls, state: dict[str, Any]) -> _ValueAutomaton:
+        """Rebuild an automaton from the attributes saved by a previous process."""
+        automaton = cls.__new__(cls)
+        automaton.__dict__.update(state)
+        return automaton
+
+    def ends(self, classes: Iterable[int]) -> list[tuple[int, int]]:
+        """Return (end position, accepting state) for every accepting step."""
+        transitions = self.transitions
+        accepting_from = self.accepting_from
+        ends: list[tuple[int, int]] = []
+        state = 0
+        for position, symbol_class in enumerate(classes):
+            state = transitions[state + symbol_class]
+            if state >= accepting_from:
+                ends.append((position, state))
+        return ends
+
+
+class EnvValueMatcher:
+    """Aho-Corasick automaton that finds every filtered .env value in one pass.
+
+    Findings match a ``\\b<value>\\b`` regex per key: every occurrence must sit
+    on word boundaries, and occurrences of the same value do not overlap. The
+    automaton is built once per hook run, so scan cost no longer grows with
+    the number of .env keys.
+
+    Content is first translated to dense character classes so the inner loop
+    is a single flat-list lookup per character. Raw bytes are matched against
+    the UTF-8 encoded values with a separate byte automaton, built on first
+    use, so blobs never need decoding.
+    """
+
+    def __init__(self, env_values: dict[str, str]) -> None:
+        self.env_values: dict[str, str] = dict(env_values)
+        self.keys: list[str] = list(env_values)
+        values = list(env_values.values())
+        self._word_start: list[bool] = [_is_word_char(value[0]) for value in values]
+        self._word_end: list[bool] = [_is_word_char(value[-1]) for value in values]
+        self._automata: dict[bool, _ValueAutomaton] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.keys)
+
+    def _automaton(self, binary: bool) -> _ValueAutomaton:
+        automaton = self._automata.get(binary)
+        if automaton is None:
+            values = self.env_values.values()
+            automaton = _ValueAutomaton(
+                [value.encode('utf-8', errors='surrogatepass') for value in values]
+                if binary else list(values)
+            )
+            self._automata[binary] = automaton
+        return automaton
+
+    def prepare(self, binary: bool = True) -> None:
+        """Build the automaton ahead of the first find(), e.g. before forking workers."""
+        if self.keys:
+            self._automaton(binary)
+
+    def state(self) -> dict[str, Any]:
+        """Return the values and built automata as plain data marshal can store."""
+        return {
+            "env_values": self.env_values,
+            "automata": {binary: vars(automaton) for binary, automaton in self._automata.items()},
+        }
+
+    @classmethod
+    def from_state(cls, state: dict[str, Any]) -> EnvValueMatcher:
+        """Rebuild a matcher from state(), without rebuilding its automata."""
+        matcher = cls(state["env_values"])
+        matcher._automata = {
+            binary: _ValueAutomaton.from_state(automaton)
+            for binary, automaton in state["automata"].items()
+        }
+        return matcher
+
+    def value_length(self, env_key: str, binary: bool = False) -> int:
+        """Return the length of an .env value in characters, or in UTF-8 bytes."""
+        value = self.env_values[env_key]
+        return len(value.encode('utf-8', errors='surrogatepass')) if binary else len(value)
+
+    def find(self, content: ScanInput) -> list[tuple[str, int]]:
+        """Return (env key, start) for every match, ordered by key then position.
+
+        Starts are character offsets for text and byte offsets for bytes.
+        """
+        if not self.keys:
+            return []
+
+        binary = not isinstance(content, str)
+        automaton = self._automaton(binary)
+        if binary:
+            classes = translate_buffer(content, automaton.byte_table)
+        else:
+            # Map every character in the content to its class in one C-level pass
+            table = {ord(char): automaton.classes.get(char, 0) for char in set(content)}
+            translated = content.translate(table)
+            classes = translated.encode('latin-1') if automaton.narrow else map(ord, translated)
+
+        found: list[tuple[int, int]] = []
+        resume_at = [0] * len(self.keys)
+        length = len(content)
+        for end, state in automaton.ends(classes):
+            for key_index in automaton.outputs[state]:
+                start = end + 1 - automaton.lengths[key_index]
+                if start < resume_at[key_index]:
+                    continue
+                before = start > 0 and _is_word_at(content, start - 1, True)
+                after = end + 1 < length and _is_word_at(content, end + 1, False)
+                if before == self._word_start[key_index] or after == self._word_end[key_index]:
+                    continue
+                found.append((key_index, start))
+                resume_at[key_index] = end + 1
+
+        found.sort()
+        return [(self.keys[key_index], start) for key_index, start in found]
+
+
 def is_env_file(file_path: str) -> bool:
     """Check if a file is an environment file that should be skipped."""
     # Handle both Unix (/) and Windows (\) path separators
     # Manual split is needed because PurePath only recognizes OS-specific separators
-    file_name = file_path.replace("\\", "/").split("/")[-1]
-    return file_name in ENV_FILE_NAMES or file_name.startswith('.env.')
+    file_path = file_path.replace("\\", "/")
+    file_name = file_path.split("/")[-1]
+    return file_name in ENV_FILE_NAMES or file_name.startswith('.env.') \
+        or matches_env_glob(file_path, get_env_globs())
 
 
 def is_binary_file(file_path: str) -> bool:
@@ -177,204 +1109,2473 @@ def is_binary_file(file_path: str) -> bool:
     return any(lower_path.endswith(ext) for ext in BINARY_EXTENSIONS)
 
 
-def get_staged_content(file_path: str) -> str | None:
-    """Get file content from git staging area to avoid TOCTOU issues."""
-    try:
-        result = subprocess.run(
-            ["git", "show", f":{file_path}"],
-            capture_output=True,
-            text=True,
-            check=True,
-            timeout=SUBPROCESS_TIMEOUT,
-        )
-        return result.stdout
-    except subprocess.CalledProcessError:
-        return None
-    except subprocess.TimeoutExpired:
-        print(f"Warning: Timeout reading staged content for {file_path}", file=sys.stderr)
-        return None
-
+def is_binary_content(data: bytes | bytearray) -> bool:
+    """Check the first BINARY_SNIFF_SIZE bytes for a NUL, as git does."""
+    return data.find(b'\0', 0, BINARY_SNIFF_SIZE) != -1
 
-def get_line_number(content: str, position: int) -> int:
-    """Calculate line number for a given position in content."""
-    return content[:position].count('\n') + 1
 
+class PathMatcher:
+    """Gitignore-style path patterns compiled into one regular expression.
 
-def check_file_for_secrets(
-    file_path: str,
-    content: str,
-    env_patterns: dict[str, re.Pattern[str]],
-) -> tuple[list[str], list[str]]:
-    """Check a single file for secrets.
+    Patterns follow .gitignore syntax: ``#`` comments, ``!`` negation, a
+    trailing ``/`` for directories, a leading or inner ``/`` to anchor at
+    the root, and ``*``, ``?``, ``[...]`` and ``**`` wildcards. The last
+    pattern that matches a path decides, and a pattern that matches a
+    directory matches everything under it.
 
-    Args:
-        file_path: Path to the file being checked
-        content: File content to scan
-        env_patterns: Pre-compiled patterns for .env values
+    All patterns are compiled into one alternation, with the ``(?:.*/)?``
+    prefix of the unanchored ones factored out, so one regex match rejects
+    a path no pattern matches. When negated patterns are present, paths it
+    accepts are matched once more against the patterns from the first
+    negation on, in reverse order and each a top-level group, so the
+    matching group identifies the last pattern that applies.
 
-    Returns:
-        Tuple of (pattern_issues, env_issues)
+    Unlike git, a negated pattern can re-include a path under an excluded
+    directory; that only ever makes the scan cover more.
     """
-    pattern_issues: list[str] = []
-    env_issues: list[str] = []
-
-    # Check for pattern-based secrets (patterns are pre-compiled at module level)
-    for compiled_pattern, description in SECRET_PATTERNS:
-        for match in compiled_pattern.finditer(content):
-            line_num = get_line_number(content, match.start())
-            pattern_issues.append(f"{file_path}:{line_num} - Found potential {description}")
-
-    # Check for hardcoded .env values
-    for env_key, compiled_pattern in env_patterns.items():
-        for match in compiled_pattern.finditer(content):
-            line_num = get_line_number(content, match.start())
-            env_issues.append(f"{file_path}:{line_num} - Found hardcoded value from .env key '{env_key}'")
-
-    return pattern_issues, env_issues
 
+    def __init__(self, lines: Iterable[str] = ()) -> None:
+        self.patterns: list[str] = []
+        self._negated: list[bool] = []  # Per group of _ordered, once compiled
+        anchored: list[str] = []
+        unanchored: list[str] = []
+        ordered: list[str] = []
+        for line in lines:
+            parsed = self._parse(line)
+            if parsed is None:
+                continue
+            expression, is_anchored, negated = parsed
+            try:
+                re.compile(expression)
+            except re.error:
+                print(f"Warning: Ignoring invalid {SECRETS_IGNORE_FILE_NAME} pattern {line!r}",
+                      file=sys.stderr)
+                continue
+            self.patterns.append(line.strip())
+            (anchored if is_anchored else unanchored).append(expression)
+            ordered.append(f"({expression})" if is_anchored else f"((?:.*/)?{expression})")
+            self._negated.append(negated)
 
-def is_git_commit_command(command: str) -> bool:
-    """Check if the command is a git commit operation."""
-    cmd_lower = command.lower()
-    return "git" in cmd_lower and "commit" in cmd_lower
+        alternatives = [*anchored]
+        if unanchored:
+            alternatives.append(f"(?:.*/)?(?:{'|'.join(unanchored)})")
+        self._any: re.Pattern[str] | None = (
+            re.compile("|".join(f"(?:{alternative})" for alternative in alternatives))
+            if alternatives else None
+        )
+        # Patterns before the first negation all exclude, so only the rest need ordering
+        first_negated = next((index for index, negated in enumerate(self._negated) if negated), None)
+        self._ordered: re.Pattern[str] | None = None
+        if first_negated is not None:
+            self._negated = self._negated[first_negated:][::-1]
+            self._ordered = re.compile("|".join(reversed(ordered[first_negated:])))
 
+    @classmethod
+    def from_file(cls, path: Path) -> PathMatcher:
+        """Load the patterns of an ignore file; a missing or unreadable one matches nothing."""
+        try:
+            text = path.read_text(encoding="utf-8", errors="replace")
+        except FileNotFoundError:
+            return cls()
+        except OSError as e:
+            print(f"Warning: Cannot read {path}: {e}", file=sys.stderr)
+            return cls()
+        return cls(text.splitlines())
 
-def main() -> None:
-    """Main entry point for the security hook."""
-    # Load hook input from stdin (fail-closed on parse error)
-    try:
-        input_data: HookInput = json.load(sys.stdin)
-    except json.JSONDecodeError as e:
-        print(f"SECURITY: Hook failed to parse input: {e}", file=sys.stderr)
-        sys.exit(ExitCode.BLOCKED)
+    def __bool__(self) -> bool:
+        return self._any is not None
 
-    # Validate input structure
-    tool_name = input_data.get("tool_name", "")
-    if not isinstance(tool_name, str):
-        tool_name = ""
+    def matches(self, path: str) -> bool:
+        """Check if a POSIX path relative to the project root is excluded."""
+        if self._any is None or self._any.fullmatch(path) is None:
+            return False
+        if self._ordered is None:
+            return True
+        match = self._ordered.fullmatch(path)
+        return match is None or not self._negated[match.lastindex - 1]
 
-    tool_input_raw = input_data.get("tool_input")
+    @classmethod
+    def _parse(cls, line: str) -> tuple[str, bool, bool] | None:
+        """Translate one ignore file line to (regex, anchored, negated), or None for no pattern.
 
-    if not isinstance(tool_input_raw, dict):
-        # Not a valid tool input - allow to proceed (not our concern)
-        sys.exit(ExitCode.SUCCESS)
+        The regex of an unanchored pattern still needs a ``(?:.*/)?`` prefix.
+        """
+        pattern = line.rstrip("\r\n")
+        stripped = pattern.rstrip(" ")
+        if stripped.endswith("\\") and len(stripped) < len(pattern):
+            stripped += " "  # An escaped trailing space is kept
+        pattern = stripped
+        if not pattern or pattern.startswith("#"):
+            return None
 
-    # Extract command safely with type narrowing
-    command_raw = tool_input_raw.get("command")
-    command: str = str(command_raw) if command_raw is not None else ""
+        negated = pattern.startswith("!")
+        if negated:
+            pattern = pattern[1:]
+        directory_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+        if not pattern:
+            return None
 
-    # Only check Bash tool with git commit operations
-    if tool_name != "Bash":
-        sys.exit(ExitCode.SUCCESS)
+        segments = pattern.split("/")
+        expression = ""
+        for index, segment in enumerate(segments):
+            last = index == len(segments) - 1
+            if segment == "**":
+                expression += ".*" if last else "(?:.*/)?"
+            else:
+                expression += cls._translate_segment(segment) + ("" if last else "/")
+        expression += "/.*" if directory_only else "(?:/.*)?"
+        return expression, anchored, negated
 
-    if not is_git_commit_command(command):
-        sys.exit(ExitCode.SUCCESS)
+    @staticmethod
+    def _translate_segment(segment: str) -> str:
+        """Translate the wildcards of one path segment; none of them match "/"."""
+        parts: list[str] = []
+        index = 0
+        while index < len(segment):
+            char = segment[index]
+            index += 1
+            if char == "*":
+                while index < len(segment) and segment[index] == "*":
+                    index += 1
+                parts.append("[^/]*")
+            elif char == "?":
+                parts.append("[^/]")
+            elif char == "\\" and index < len(segment):
+                parts.append(re.escape(segment[index]))
+                index += 1
+            elif char == "[":
+                end = index + 1 if segment[index:index + 1] in ("!", "^") else index
+                end = segment.find("]", end + 1 if segment[end:end + 1] == "]" else end)
+                if end == -1:
+                    parts.append(re.escape(char))
+                    continue
+                members = segment[index:end]
+                index = end + 1
+                prefix = "^/" if members[:1] in ("!", "^") else ""
+                if prefix:
+                    members = members[1:]
+                escaped = "".join(
+                    member if member == "-" else re.escape(member) for member in members
+                )
+                parts.append(f"[{prefix}{escaped}]")
+            else:
+                parts.append(re.escape(char))
+        return "".join(parts)
 
-    # Get project directory (don't chdir - avoid global state mutation)
-    project_dir: str | None = os.environ.get("CLAUDE_PROJECT_DIR")
-    project_root = Path(project_dir) if project_dir else Path.cwd()
 
-    # Change to project directory for git operations
-    original_cwd = Path.cwd()
-    if project_dir:
-        os.chdir(project_root)
+def load_secrets_ignore(project_root: Path) -> PathMatcher:
+    """Load the SECRETS_IGNORE_FILE_NAME patterns at project_root."""
+    return PathMatcher.from_file(project_root / SECRETS_IGNORE_FILE_NAME)
 
-    try:
-        _run_secret_check(project_root)
-    finally:
-        # Restore original directory
-        os.chdir(original_cwd)
 
+def get_path_attributes(paths: list[str]) -> PathAttributes | None:
+    """Resolve the attributes the scan depends on for paths, from the staged .gitattributes.
 
-def _run_secret_check(project_root: Path) -> None:
-    """Run the secret check logic.
+    ``binary``, ``diff`` and the EXCLUDE_ATTRIBUTES are resolved for all
+    paths in one ``git check-attr --stdin`` call against the index.
 
-    Args:
-        project_root: Root directory of the project being checked
+    Returns:
+        The attribute-marked paths, or None if git could not be queried
     """
-    # Load and filter .env values for secret detection
-    env_path = project_root / ".env"
-    env_vars = parse_env_file(env_path)
-    secret_env_values = filter_env_values(env_vars)
-
-    # Get staged files (fail-closed on error)
+    if not paths:
+        return PathAttributes(set(), set())
     try:
         result = subprocess.run(
-            ["git", "diff", "--cached", "--name-only"],
+            ["git", "check-attr", "--stdin", "-z", "--cached", "binary", "diff", *EXCLUDE_ATTRIBUTES],
+            input=b"".join(path.encode('utf-8', errors='surrogateescape') + b'\0' for path in paths),
             capture_output=True,
-            text=True,
             check=True,
             timeout=SUBPROCESS_TIMEOUT,
         )
-        staged_files: list[str] = [f for f in result.stdout.strip().split('\n') if f]
-    except subprocess.CalledProcessError as e:
-        print(f"SECURITY: Failed to get staged files: {e}", file=sys.stderr)
-        sys.exit(ExitCode.BLOCKED)
-    except subprocess.TimeoutExpired:
-        print("SECURITY: Timeout getting staged files", file=sys.stderr)
-        sys.exit(ExitCode.BLOCKED)
+    except (OSError, subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        return None
 
-    if not staged_files:
-        sys.exit(ExitCode.SUCCESS)
+    # With -z each answer is "<path>\0<attribute>\0<value>\0"; paths round-trip
+    # through surrogateescape like those of get_staged_files()
+    fields = result.stdout.decode('utf-8', errors='surrogateescape').split('\0')
+    attributes = PathAttributes(set(), set())
+    for path, attribute, value in zip(fields[0::3], fields[1::3], fields[2::3]):
+        if (attribute, value) in (("binary", "set"), ("diff", "unset")):
+            attributes.binary.add(path)
+        elif attribute in EXCLUDE_ATTRIBUTES and value in EXCLUDE_ATTRIBUTE_VALUES:
+            attributes.excluded.add(path)
+    return attributes
 
-    # Pre-compile .env value patterns once (avoid recompilation per file)
-    env_patterns: dict[str, re.Pattern[str]] = {
-        key: re.compile(rf'\b{re.escape(value)}\b')
-        for key, value in secret_env_values.items()
-    }
 
-    all_pattern_issues: list[str] = []
-    all_env_issues: list[str] = []
+def get_staged_files() -> list[StagedFile]:
+    """List staged paths with their index object IDs in a single git call.
 
-    # Check each staged file
-    for file_path in sorted(staged_files):
-        # Skip binary files (case-insensitive)
-        if is_binary_file(file_path):
-            continue
+    Deleted paths and submodule entries are omitted since they have no blob
+    content to scan. The same call's ``--numstat`` section reports which
+    blobs git itself considers binary. Paths that are not valid UTF-8 are
+    decoded with surrogateescape, so they round-trip back to git unchanged.
 
-        # Skip .env files themselves
-        if is_env_file(file_path):
-            continue
+    Raises:
+        subprocess.CalledProcessError: If git fails
+        subprocess.TimeoutExpired: If git does not respond in time
+    """
+    result = subprocess.run(
+        [
+            "git", "diff", "--cached", "--raw", "--numstat", "--no-abbrev",
+            "--no-renames", "--diff-filter=d", "-z",
+        ],
+        capture_output=True,
+        check=True,
+        timeout=SUBPROCESS_TIMEOUT,
+    )
 
-        # Read content from git staging area (not disk - avoids TOCTOU)
-        content = get_staged_content(file_path)
-        if content is None:
-            continue
+    # With -z, raw entries are ":<old mode> <new mode> <old id> <new id> <status>\0<path>\0"
+    # and are followed by numstat entries "<added>\t<deleted>\t<path>\0" ("-" for binaries)
+    fields = iter(result.stdout.split(b'\0'))
+    entries: list[tuple[str, str]] = []
+    binary_paths: set[str] = set()
+    for field in fields:
+        if field.startswith(b':'):
+            parts = field[1:].split()
+            path = next(fields, b'')
+            if len(parts) < 5 or not path or parts[1] == GITLINK_MODE.encode():
+                continue
+            entries.append((path.decode('utf-8', errors='surrogateescape'), parts[3].decode('ascii')))
+        elif field.startswith(b'-\t-\t'):
+            binary_paths.add(field[4:].decode('utf-8', errors='surrogateescape'))
 
-        # Check staged content size (not disk file size - they can differ!)
-        if len(content) > MAX_FILE_SIZE:
-            print(f"Warning: Skipping oversized staged content {file_path}", file=sys.stderr)
-            continue
+    return [StagedFile(path, object_id, path in binary_paths) for path, object_id in entries]
+
+
+def parse_push_revisions(command: str) -> list[str] | None:
+    """Return the git log revisions of the commits a git push command sends.
+
+    Each refspec's source (HEAD when none is given, every branch for --all)
+    is taken down to the commits some remote already has. Sources that do
+    not name a local commit are ignored, as git push would reject them.
+
+    Returns:
+        The revisions, or None if the command runs no git push. A command
+        that cannot be tokenized is taken to push HEAD.
+    """
+    try:
+        lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+        lexer.whitespace_split = True
+        tokens = list(lexer)
+    except ValueError:
+        return ["--ignore-missing", "HEAD", *PUSH_UNPUSHED]  # Unbalanced quotes
 
-        # Skip tiny files (likely empty or minimal templates)
-        if len(content) < 10:
+    heads: list[str] | None = None
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        index += 1
+        if token != "git" and not token.endswith("/git"):
             continue
+        # The subcommand is the first token after git's own options and their values
+        while index < len(tokens) and tokens[index].startswith("-"):
+            index += 2 if tokens[index] in GIT_VALUE_OPTIONS else 1
+        if index < len(tokens) and tokens[index] == "push":
+            index += 1
+            heads = heads if heads is not None else []
+            arguments: list[str] = []
+            deleting = False
+            pushes_refs = False
+            while index < len(tokens) and tokens[index] not in SHELL_SEPARATORS:
+                argument = tokens[index]
+                index += 1
+                if argument in PUSH_VALUE_OPTIONS:
+                    index += 1
+                elif argument in ("--all", "--branches", "--mirror"):
+                    heads.append("--branches")
+                    pushes_refs = True
+                elif argument == "--tags":
+                    heads.append("--tags")
+                    pushes_refs = True
+                elif argument in ("-d", "--delete"):
+                    deleting = True
+                elif not argument.startswith("-"):
+                    arguments.append(argument)
+            # The first argument is the remote; the rest are refspecs
+            if not deleting:
+                heads.extend(
+                    source for refspec in arguments[1:]
+                    if (source := refspec.lstrip("+").split(":", 1)[0])
+                )
+                if len(arguments) < 2 and not pushes_refs:
+                    heads.append("HEAD")
 
-        # Check file for secrets using extracted helper
-        pattern_issues, env_issues = check_file_for_secrets(file_path, content, env_patterns)
-        all_pattern_issues.extend(pattern_issues)
-        all_env_issues.extend(env_issues)
+    return None if heads is None else ["--ignore-missing", *heads, *PUSH_UNPUSHED]
 
-    # If secrets found, block the commit
-    if all_pattern_issues or all_env_issues:
-        print("\n" + "=" * 60, file=sys.stderr)
-        print("SECURITY WARNING: Potential secrets detected in staged files!", file=sys.stderr)
-        print("=" * 60 + "\n", file=sys.stderr)
 
-        if all_pattern_issues:
-            print("  Pattern-based detections:", file=sys.stderr)
-            for issue in sorted(all_pattern_issues):
-                print(f"    - {issue}", file=sys.stderr)
-            print("", file=sys.stderr)
+def list_range_blobs(revisions: list[str]) -> list[StagedFile]:
+    """List the blobs the commits in a range add or change, once per path and blob.
 
-        if all_env_issues:
-            print("  Hardcoded .env values detected:", file=sys.stderr)
-            for issue in sorted(all_env_issues):
-                print(f"    - {issue}", file=sys.stderr)
-            print("", file=sys.stderr)
+    One ``git log --raw`` call covers the whole range, however many commits
+    it has. Merges are diffed in combined form, so content a merge
+    resolution introduces is listed while files taken cleanly from one side
+    are not.
 
-        print("Please remove secrets before committing.", file=sys.stderr)
-        if all_env_issues:
+    Raises:
+        OSError: If git cannot be started
+        subprocess.CalledProcessError: If git fails (e.g. an unknown revision)
+        subprocess.TimeoutExpired: If git does not exit in time after its output ends
+    """
+    command = [
+        "git", "log", "--raw", "-c", "--no-renames", "--no-abbrev", "--no-ext-diff",
+        "--format=", "-z", *revisions, "--",
+    ]
+    entries: set[tuple[str, str]] = set()
+    # With -z: ":<old mode> <new mode> <old id> <new id> <status>\0<path>\0", and for
+    # merges one colon, mode and id per parent before the resulting mode and id
+    fields = _split_stream(_stream_git(command), b'\0')
+    for field in fields:
+        field = field.lstrip(b'\n')
+        if not field.startswith(b':'):
+            continue
+        parents = len(field) - len(field.lstrip(b':'))
+        parts = field[parents:].split()
+        path = next(fields, b'')
+        if len(parts) < 2 * parents + 3 or not path:
+            continue
+        mode, object_id = parts[parents].decode('ascii'), parts[2 * parents + 1].decode('ascii')
+        if mode in ("000000", GITLINK_MODE):
+            continue  # Deleted, or a submodule commit
+        entries.add((path.decode('utf-8', errors='surrogateescape'), object_id))
+
+    return [StagedFile(path, object_id) for path, object_id in sorted(entries)]
+
+
+class BlobReader:
+    """Read blobs from the object database through one ``git cat-file --batch`` process.
+
+    Each blob is requested by object ID and its header is returned before the
+    body is read, so callers can stream oversized blobs in chunks instead of
+    ever holding them in memory.
+
+    Usage:
+        with BlobReader() as reader:
+            header = reader.request(object_id)
+            if header is not None and header.size <= MAX_FILE_SIZE:
+                content = reader.read_body(header)
+            elif header is not None:
+                for chunk in reader.iter_body(header):
+                    ...
+    """
+
+    def __init__(self) -> None:
+        self._process: subprocess.Popen[bytes] | None = None
+
+    def __enter__(self) -> BlobReader:
+        self._process = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the cat-file process."""
+        if self._process is None:
+            return
+        process, self._process = self._process, None
+        try:
+            if process.stdin is not None:
+                process.stdin.close()
+            process.wait(timeout=SUBPROCESS_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+            process.wait()
+        finally:
+            if process.stdout is not None:
+                process.stdout.close()
+
+    def _pipes(self) -> tuple[IO[bytes], IO[bytes]]:
+        if self._process is None or self._process.stdin is None or self._process.stdout is None:
+            raise OSError("BlobReader is not open")
+        return self._process.stdin, self._process.stdout
+
+    def request(self, object_id: str) -> BlobHeader | None:
+        """Request an object and return its header, or None if it is missing.
+
+        When a header is returned, its body must be consumed with read_body()
+        or skip_body() before the next request.
+
+        Raises:
+            OSError: If the cat-file process exits or returns a malformed header
+        """
+        stdin, stdout = self._pipes()
+        stdin.write(object_id.encode('ascii') + b'\n')
+        stdin.flush()
+
+        line = stdout.readline()
+        if not line.endswith(b'\n'):
+            raise OSError("git cat-file exited unexpectedly")
+
+        parts = line.decode('ascii', errors='replace').split()
+        if len(parts) == 2 and parts[1] == "missing":
+            return None
+        if len(parts) != 3 or not parts[2].isdigit():
+            raise OSError(f"Unexpected git cat-file header: {line!r}")
+
+        return BlobHeader(parts[0], parts[1], int(parts[2]))
+
+    def read_body(self, header: BlobHeader) -> bytes:
+        """Read the body of the most recently requested object."""
+        _, stdout = self._pipes()
+        data = stdout.read(header.size)
+        if len(data) != header.size:
+            raise OSError("git cat-file exited unexpectedly")
+        self._consume_terminator(stdout)
+        return data
+
+    def read_text_body(self, header: BlobHeader) -> bytearray | None:
+        """Read the body of the most recently requested object unless it is binary.
+
+        The first BINARY_SNIFF_SIZE bytes are read and checked for a NUL
+        first; binary bodies are discarded without reading the rest. Text
+        is read into a single buffer, without an intermediate copy.
+        """
+        _, stdout = self._pipes()
+        body = bytearray(header.size)
+        with memoryview(body) as view:
+            head = min(header.size, BINARY_SNIFF_SIZE)
+            self._read_into(stdout, view[:head])
+            if is_binary_content(body):
+                self._discard(stdout, header.size - head)
+                return None
+            self._read_into(stdout, view[head:])
+        self._consume_terminator(stdout)
+        return body
+
+    def iter_body(self, header: BlobHeader) -> Iterator[bytes]:
+        """Yield the body of the most recently requested object in bounded chunks.
+
+        The iterator must be exhausted before the next request.
+        """
+        _, stdout = self._pipes()
+        remaining = header.size
+        while remaining > 0:
+            chunk = stdout.read(min(remaining, BLOB_READ_CHUNK_SIZE))
+            if not chunk:
+                raise OSError("git cat-file exited unexpectedly")
+            remaining -= len(chunk)
+            yield chunk
+        self._consume_terminator(stdout)
+
+    def skip_body(self, header: BlobHeader) -> None:
+        """Discard the body of the most recently requested object in bounded chunks."""
+        _, stdout = self._pipes()
+        self._discard(stdout, header.size)
+
+    def _discard(self, stdout: IO[bytes], size: int) -> None:
+        """Discard size more body bytes and the terminator."""
+        remaining = size
+        while remaining > 0:
+            chunk = stdout.read(min(remaining, BLOB_READ_CHUNK_SIZE))
+            if not chunk:
+                raise OSError("git cat-file exited unexpectedly")
+            remaining -= len(chunk)
+        self._consume_terminator(stdout)
+
+    @staticmethod
+    def _read_into(stdout: IO[bytes], view: memoryview) -> None:
+        filled = 0
+        while filled < len(view):
+            count = stdout.readinto(view[filled:])
+            if not count:
+                raise OSError("git cat-file exited unexpectedly")
+            filled += count
+
+    @staticmethod
+    def _consume_terminator(stdout: IO[bytes]) -> None:
+        if stdout.read(1) != b'\n':
+            raise OSError("git cat-file returned a malformed object body")
+
+
+def get_scan_mode() -> str:
+    """Return the configured scan mode, falling back to a full scan if it is unknown."""
+    mode = os.environ.get(SCAN_MODE_ENV_VAR, SCAN_MODE_FULL).strip().lower()
+    if mode not in SCAN_MODES:
+        print(
+            f"Warning: Unknown {SCAN_MODE_ENV_VAR}={mode!r}, using {SCAN_MODE_FULL!r}",
+            file=sys.stderr,
+        )
+        return SCAN_MODE_FULL
+    return mode
+
+
+def unquote_git_path(path: str) -> str:
+    """Decode a path that git may have C-quoted in diff headers."""
+    if not (len(path) >= 2 and path[0] == '"' and path[-1] == '"'):
+        return path
+
+    raw = bytearray()
+    body = path[1:-1]
+    index = 0
+    while index < len(body):
+        char = body[index]
+        if char != '\\' or index + 1 == len(body):
+            raw += char.encode('utf-8', errors='surrogateescape')
+            index += 1
+        elif body[index + 1] in '01234567':
+            raw.append(int(body[index + 1:index + 4], 8) & 0xFF)
+            index += 4
+        else:
+            raw.append(_GIT_PATH_ESCAPES.get(body[index + 1], ord(body[index + 1])))
+            index += 2
+    return raw.decode('utf-8', errors='replace')
+
+
+def parse_added_lines(lines: Iterable[bytes]) -> Iterator[tuple[str, list[AddedBlock]]]:
+    """Parse ``git diff -U0`` output into the added lines of each file.
+
+    Hunk line counts are tracked so added lines that happen to look like diff
+    headers are never mistaken for them. Consecutive added lines are joined
+    into one block so detectors spanning several lines still match.
+
+    Yields:
+        (path, blocks) for every file with at least one added line
+    """
+    path: str | None = None
+    blocks: list[AddedBlock] = []
+    block_lines: list[str] = []
+    block_start = 0
+    next_line = 0
+    old_remaining = 0
+    new_remaining = 0
+
+    def close_block() -> None:
+        if block_lines:
+            blocks.append(AddedBlock(block_start, '\n'.join(block_lines)))
+            block_lines.clear()
+
+    for raw_line in lines:
+        line = raw_line.rstrip(b'\n')
+
+        # Inside a hunk: consume exactly the counted old and new lines
+        if old_remaining or new_remaining:
+            if line.startswith(b'+') and new_remaining:
+                if not block_lines:
+                    block_start = next_line
+                block_lines.append(line[1:].decode('utf-8', errors='replace'))
+                next_line += 1
+                new_remaining -= 1
+            elif line.startswith(b'-') and old_remaining:
+                old_remaining -= 1
+            continue
+
+        if line.startswith(b'@@ '):
+            match = HUNK_HEADER_PATTERN.match(line)
+            if match is None:
+                continue
+            old_count, new_start, new_count = match.groups()
+            old_remaining = 1 if old_count is None else int(old_count)
+            new_remaining = 1 if new_count is None else int(new_count)
+            # Hunks that are not adjacent start a new block
+            if int(new_start) != next_line:
+                close_block()
+            next_line = int(new_start)
+        elif line.startswith(b'diff '):
+            close_block()
+            if path is not None and blocks:
+                yield path, blocks
+            path, blocks, next_line = None, [], 0
+        elif line.startswith(b'+++ '):
+            # Git appends a tab to unquoted paths containing spaces
+            target = line[4:].decode('utf-8', errors='surrogateescape').removesuffix('\t')
+            path = None if target == '/dev/null' else unquote_git_path(target)
+
+    close_block()
+    if path is not None and blocks:
+        yield path, blocks
+
+
+def iter_staged_additions() -> Iterator[tuple[str, list[AddedBlock]]]:
+    """Stream ``git diff --cached -U0`` and yield the added lines of each staged file.
+
+    Paths marked generated or vendored (EXCLUDE_ATTRIBUTES) are left out
+    by git itself, through ``attr:`` pathspecs.
+
+    Raises:
+        OSError: If git cannot be started
+        subprocess.CalledProcessError: If git exits with an error
+        subprocess.TimeoutExpired: If git does not exit in time after its output ends
+    """
+    command = [
+        "git", "-c", "core.quotePath=false", "diff", "--cached", "-U0",
+        "--no-color", "--no-ext-diff", "--no-renames", "--no-prefix", "--diff-filter=d",
+        "--", ":/", *(
+            f":(top,exclude,attr:{name}{value})"
+            for name in EXCLUDE_ATTRIBUTES for value in ("", "=true")
+        ),
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        if process.stdout is None:
+            raise OSError("git diff produced no output stream")
+        yield from parse_added_lines(process.stdout)
+        returncode = process.wait(timeout=SUBPROCESS_TIMEOUT)
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, command)
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        if process.stdout is not None:
+            process.stdout.close()
+
+
+@lru_cache(maxsize=None)
+def _load_numpy() -> ModuleType | None:
+    """Import NumPy on first use, or return None if it is not installed."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class LineIndex:
+    """Resolve positions in one blob to line numbers by binary search.
+
+    Newline offsets are collected on the first lookup, so blobs without
+    findings never pay for the index. Large buffers use NumPy's
+    ``flatnonzero`` when it is installed. Positions are character offsets
+    for text and byte offsets for bytes.
+    """
+
+    def __init__(self, content: ScanInput) -> None:
+        self._content = content
+        self._newlines: list[int] | None = None
+
+    def line_number(self, position: int) -> int:
+        """Return the 1-based line number of position."""
+        if self._newlines is None:
+            self._newlines = self._build()
+        return bisect_left(self._newlines, position) + 1
+
+    def _build(self) -> list[int]:
+        content = self._content
+        numpy = _load_numpy() if len(content) >= NUMPY_LINE_INDEX_MIN_SIZE else None
+        if numpy is not None:
+            # One code unit per character keeps offsets in character positions
+            if not isinstance(content, str):
+                units = numpy.frombuffer(content, dtype=numpy.uint8)
+            elif content.isascii():
+                units = numpy.frombuffer(content.encode('ascii'), dtype=numpy.uint8)
+            else:
+                units = numpy.frombuffer(content.encode('utf-32-le'), dtype=numpy.uint32)
+            return numpy.flatnonzero(units == 10).tolist()
+
+        newlines: list[int] = []
+        newline = '\n' if isinstance(content, str) else b'\n'
+        find = content.find
+        position = find(newline)
+        while position != -1:
+            newlines.append(position)
+            position = find(newline, position + 1)
+        return newlines
+
+
+@lru_cache(maxsize=8)
+def _parse_entropy_thresholds(configured: str) -> dict[str, float] | None:
+    if configured.lower() in ("0", "off", "false", "no"):
+        return None
+    thresholds = dict(ENTROPY_THRESHOLDS)
+    for item in configured.split(","):
+        char_class, _, value = item.partition("=")
+        try:
+            if char_class.strip() not in thresholds:
+                raise ValueError(char_class)
+            thresholds[char_class.strip()] = float(value)
+        except ValueError:
+            print(f"Warning: Ignoring invalid {ENTROPY_ENV_VAR} entry {item.strip()!r}",
+                  file=sys.stderr)
+    return thresholds
+
+
+def get_entropy_thresholds() -> dict[str, float] | None:
+    """Return the entropy threshold per character class, or None if the detector is off."""
+    configured = os.environ.get(ENTROPY_ENV_VAR, "").strip()
+    return _parse_entropy_thresholds(configured) if configured else ENTROPY_THRESHOLDS
+
+
+_DIGITS: bytes = b'0123456789'
+_HEX_DIGITS: bytes = b'0123456789abcdefABCDEF'
+_ALNUM: bytes = b'0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+def classify_token(token: bytes) -> str:
+    """Return the character class of a candidate value: hex, alnum or base64."""
+    if not token.translate(None, _HEX_DIGITS):
+        return "hex"
+    if not token.translate(None, _ALNUM):
+        return "alnum"
+    return "base64"
+
+
+def shannon_entropy(tokens: list[bytes]) -> list[float]:
+    """Return the Shannon entropy, in bits per character, of each token.
+
+    Batches of NUMPY_ENTROPY_MIN_TOKENS or more are computed together from
+    one NumPy histogram of (token, byte) pairs when NumPy is installed.
+    """
+    numpy = _load_numpy() if len(tokens) >= NUMPY_ENTROPY_MIN_TOKENS else None
+    if numpy is None:
+        entropies: list[float] = []
+        for token in tokens:
+            length = len(token)
+            counts = Counter(token).values()
+            entropies.append(log2(length) - sum(count * log2(count) for count in counts) / length)
+        return entropies
+
+    # H = log2(n) - sum(c * log2(c)) / n over each token's byte counts c
+    lengths = numpy.fromiter(map(len, tokens), dtype=numpy.int64, count=len(tokens))
+    data = numpy.frombuffer(b''.join(tokens), dtype=numpy.uint8).astype(numpy.int64)
+    rows = numpy.repeat(numpy.arange(len(tokens), dtype=numpy.int64), lengths)
+    pairs, counts = numpy.unique(rows * 256 + data, return_counts=True)
+    weighted = numpy.bincount(
+        pairs >> 8, weights=counts * numpy.log2(counts), minlength=len(tokens)
+    )
+    return (numpy.log2(lengths) - weighted / lengths).tolist()
+
+
+def select_high_entropy(
+    matches: list[re.Match[str] | re.Match[bytes]],
+) -> list[tuple[re.Match[str] | re.Match[bytes], str]]:
+    """Keep the ENTROPY_CANDIDATE matches whose value exceeds its class threshold.
+
+    Returns:
+        (match, finding label) for each high-entropy value, in input order
+    """
+    thresholds = get_entropy_thresholds()
+    if thresholds is None or not matches:
+        return []
+
+    tokens = [
+        value if isinstance(value := match.group(1), bytes) else value.encode('ascii')
+        for match in matches
+    ]
+    selected: list[tuple[re.Match[str] | re.Match[bytes], str]] = []
+    for match, token, entropy in zip(matches, tokens, shannon_entropy(tokens)):
+        # Generated credentials mix letters and digits; identifiers such as
+        # class names rarely contain digits, and numbers have no letters
+        letters = token.translate(None, _DIGITS)
+        if len(letters) in (0, len(token)) or entropy < min(thresholds.values()):
+            continue
+        char_class = classify_token(token)
+        if char_class == "hex" and len(token) in ENTROPY_DIGEST_HEX_LENGTHS:
+            continue  # A digest, e.g. a cache key or commit SHA
+        if ENTROPY_UUID_PATTERN.fullmatch(token):
+            continue
+        if entropy >= thresholds[char_class]:
+            selected.append((match, f"high-entropy {char_class} value"))
+    return selected
+
+
+def scan_content(
+    content: ScanInput,
+    env_matcher: EnvValueMatcher,
+    first_line: int = 1,
+    limit: int = 0,
+) -> list[Finding]:
+    """Scan content for secrets and return path-independent findings.
+
+    Args:
+        content: Text, or raw bytes scanned without decoding
+        env_matcher: Automaton over the filtered .env values
+        first_line: File line number of the first line of content
+        limit: Return only the first limit findings by position, and stop
+            scanning once they are known (0 for all). Fewer than limit
+            findings means none were left out.
+
+    Returns:
+        Pattern findings (by detector, then position) followed by .env findings
+    """
+    if limit:
+        return _scan_content_limited(content, env_matcher, first_line, limit)
+
+    findings: list[Finding] = []
+
+    # Line offsets are only indexed if the file has findings
+    lines = LineIndex(content)
+
+    # Check for pattern-based secrets in a single pass over the content
+    candidates: list[re.Match[str] | re.Match[bytes]] = []
+    for detector, match in SCAN_ENGINE.scan(content):
+        if detector is ENTROPY_CANDIDATE:
+            candidates.append(match)
+            continue
+        line_num = lines.line_number(match.start()) + first_line - 1
+        findings.append(Finding(FINDING_PATTERN, line_num, detector.description))
+
+    # Entropy findings on lines a specific detector already flagged add nothing
+    flagged_lines = {finding.line for finding in findings}
+    for match, label in select_high_entropy(candidates):
+        line_num = lines.line_number(match.start()) + first_line - 1
+        if line_num not in flagged_lines:
+            findings.append(Finding(FINDING_PATTERN, line_num, label))
+
+    # Check for hardcoded .env values
+    for env_key, start in env_matcher.find(content):
+        line_num = lines.line_number(start) + first_line - 1
+        findings.append(Finding(FINDING_ENV, line_num, env_key))
+
+    return findings
+
+
+def _scan_content_limited(
+    content: ScanInput,
+    env_matcher: EnvValueMatcher,
+    first_line: int,
+    limit: int,
+) -> list[Finding]:
+    """Return the first limit findings of content by position, in scan_content() order.
+
+    Pattern matches are taken in position order, one line at a time, since an
+    entropy finding only stands on a line without a named one. The scan stops
+    once limit findings are settled, and .env values are then only searched
+    for up to the last of them, so a file full of fake keys costs no more
+    than its first few.
+    """
+    newline = '\n' if isinstance(content, str) else b'\n'
+    detector_order = {detector: index for index, detector in enumerate(SCAN_ENGINE.detectors)}
+
+    # (position, detector order, line, label) of settled pattern findings
+    settled: list[tuple[int, int, int, str]] = []
+    named: list[tuple[int, int, int, str]] = []  # Findings of the current line
+    entropy: list[tuple[int, int, int, str]] = []
+    line, counted_to = first_line, 0
+
+    def settle() -> None:
+        settled.extend(named or entropy)
+        named.clear()
+        entropy.clear()
+
+    for detector, match in SCAN_ENGINE.iter_hits(content):
+        start = match.start()
+        hit_line = line + content.count(newline, counted_to, start)
+        if hit_line != line:
+            settle()
+            if len(settled) >= limit:
+                break
+            line = hit_line
+        counted_to = start
+
+        room = limit - len(settled)
+        if detector is not ENTROPY_CANDIDATE:
+            if len(named) < room:
+                named.append((start, detector_order[detector], line, detector.description))
+            if len(named) >= room:
+                break  # Later findings on this line are past the limit
+        elif not named and len(entropy) < room:
+            for _, label in select_high_entropy([match]):
+                entropy.append((start, detector_order[detector], line, label))
+    settle()
+    del settled[limit:]
+
+    env_content, env_before = content, len(content)
+    if len(settled) == limit and env_matcher:
+        # .env values starting after the last kept pattern finding cannot be
+        # among the first; the slice keeps the character after each candidate
+        env_before = settled[-1][0] + 1
+        longest = max(env_matcher.value_length(key, not isinstance(content, str)) for key in env_matcher.keys)
+        env_content = content[:env_before + longest]
+    key_order = {key: index for index, key in enumerate(env_matcher.keys)}
+    env_found = sorted(
+        (start, key_order[env_key], env_key)
+        for env_key, start in env_matcher.find(env_content) if start < env_before
+    )
+
+    kept = sorted(
+        [(position, 0, order, label, line) for position, order, line, label in settled]
+        + [(position, 1, order, env_key, 0) for position, order, env_key in env_found[:limit]]
+    )[:limit]
+
+    findings: list[tuple[int, int, int, Finding]] = []
+    line, counted_to = first_line, 0
+    for position, kind, order, label, pattern_line in kept:
+        line += content.count(newline, counted_to, position)
+        counted_to = position
+        finding = (Finding(FINDING_PATTERN, pattern_line, label) if kind == 0
+                   else Finding(FINDING_ENV, line, label))
+        findings.append((kind, order, position, finding))
+    findings.sort(key=lambda item: item[:3])
+    return [finding for *_, finding in findings]
+
+
+def format_findings(
+    file_path: str,
+    findings: Iterable[Finding],
+) -> tuple[list[str], list[str]]:
+    """Format findings for a file into (pattern_issues, env_issues) messages."""
+    pattern_issues: list[str] = []
+    env_issues: list[str] = []
+
+    for finding in findings:
+        if finding.kind == FINDING_ENV:
+            source, key = split_env_label(finding.label)
+            env_issues.append(
+                f"{file_path}:{finding.line} - Found hardcoded value from {source} key '{key}'"
+            )
+        else:
+            pattern_issues.append(f"{file_path}:{finding.line} - Found potential {finding.label}")
+
+    return pattern_issues, env_issues
+
+
+class FindingReport:
+    """Formatted findings of one check, bounded by the per-file and total caps.
+
+    Findings past the total cap are only counted, so a commit that vendors
+    thousands of fake keys costs neither memory for messages nor a flood on
+    stderr. A file over its cap keeps its first findings by line; files are
+    scanned with scan_limit(), so findings past the per-file cap are not
+    even looked for.
+    """
+
+    def __init__(self, per_file: int = 0, total: int = 0, fail_fast: bool = False) -> None:
+        self.per_file = per_file
+        self.total = total
+        self.fail_fast = fail_fast
+        self.pattern_issues: list[str] = []
+        self.env_issues: list[str] = []
+        self.suppressed = 0
+        self.capped = 0  # Files that reached the per-file cap, and may hold more findings
+        self.stopped = False  # Fail-fast ended the scan before every file was checked
+
+    def __len__(self) -> int:
+        return len(self.pattern_issues) + len(self.env_issues)
+
+    def found(self) -> bool:
+        """Return whether any finding was added, shown or not."""
+        return bool(self.pattern_issues or self.env_issues or self.suppressed)
+
+    def scan_limit(self) -> int:
+        """Return how many findings of each file to scan for (0 for all): one in fail-fast mode."""
+        return 1 if self.fail_fast else self.per_file
+
+    def add(self, file_path: str, findings: Sequence[Finding]) -> None:
+        """Format the findings of one file, up to the caps."""
+        if not findings:
+            return
+        if self.per_file and len(findings) >= self.per_file:
+            self.capped += 1
+        kept = len(findings)
+        if self.per_file:
+            kept = min(kept, self.per_file)
+        if self.total:
+            kept = min(kept, max(0, self.total - len(self)))
+        if kept < len(findings):
+            self.suppressed += len(findings) - kept
+            findings = sorted(findings, key=lambda finding: finding.line)[:kept]
+
+        pattern_issues, env_issues = format_findings(file_path, findings)
+        self.pattern_issues.extend(pattern_issues)
+        self.env_issues.extend(env_issues)
+
+
+def get_finding_report() -> FindingReport:
+    """Return an empty report with the configured caps and fail-fast setting."""
+    limits: list[int] = []
+    for env_var, default in (
+        (MAX_FINDINGS_PER_FILE_ENV_VAR, DEFAULT_MAX_FINDINGS_PER_FILE),
+        (MAX_FINDINGS_ENV_VAR, DEFAULT_MAX_FINDINGS),
+    ):
+        configured = os.environ.get(env_var, "").strip()
+        limit = default
+        if configured:
+            try:
+                limit = max(0, int(configured))
+            except ValueError:
+                print(f"Warning: Ignoring invalid {env_var}={configured!r}", file=sys.stderr)
+        limits.append(limit)
+
+    fail_fast = os.environ.get(FAIL_FAST_ENV_VAR, "").strip().lower() in ("1", "true", "yes", "on")
+    return FindingReport(*limits, fail_fast=fail_fast)
+
+
+def check_file_for_secrets(
+    file_path: str,
+    content: ScanInput,
+    env_matcher: EnvValueMatcher,
+    first_line: int = 1,
+) -> tuple[list[str], list[str]]:
+    """Check a single file for secrets.
+
+    Args:
+        file_path: Path to the file being checked
+        content: File content to scan, as text or raw bytes
+        env_matcher: Automaton over the filtered .env values
+        first_line: File line number of the first line of content
+
+    Returns:
+        Tuple of (pattern_issues, env_issues)
+    """
+    return format_findings(file_path, scan_content(content, env_matcher, first_line))
+
+
+def scan_stream(
+    chunks: Iterable[str] | Iterable[bytes],
+    env_matcher: EnvValueMatcher,
+    first_line: int = 1,
+    window_size: int = STREAM_WINDOW_SIZE,
+    limit: int = 0,
+) -> list[Finding]:
+    """Scan content of any length in fixed windows, holding at most one window in memory.
+
+    Each window reports matches starting in its own span and is scanned with
+    STREAM_CONTEXT characters (or bytes) of surrounding content on either
+    side, so matches and word boundaries that straddle a window edge are
+    found exactly once. Matches longer than STREAM_CONTEXT may be cut short
+    at a window edge but are still reported. Line numbers are carried
+    across windows.
+
+    Args:
+        chunks: Text or raw bytes in pieces of any size (not mixed)
+        env_matcher: Automaton over the filtered .env values
+        first_line: File line number of the first line of the text
+        window_size: Characters reported per window
+        limit: Return only the first limit findings by position, like
+            scan_content(); no window is scanned once they are known. The
+            rest of chunks is then left unread.
+
+    Returns:
+        Findings in the same order as scan_content()
+    """
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is None:
+        return []
+    binary = not isinstance(first, str)
+    empty = first[:0]
+    newline = b'\n' if binary else '\n'
+
+    context = max([STREAM_CONTEXT, *(env_matcher.value_length(key, True) + 1 for key in env_matcher.keys)])
+    detector_order = {detector: index for index, detector in enumerate(SCAN_ENGINE.detectors)}
+    key_order = {key: index for index, key in enumerate(env_matcher.keys)}
+
+    ordered: list[tuple[int, int, int, Finding]] = []
+    # Absolute end of the last reported match, per detector and per .env key
+    resume_at: dict[tuple[str, object], int] = {}
+
+    carry = empty  # Unreported content, preceded by up to `context` units of reported content
+    report_from = 0  # Index in carry where unreported content starts
+    carry_offset = 0  # Absolute offset of carry[0]
+    carry_line = first_line  # File line number of carry[0]
+
+    named_count = 0  # Findings of named detectors; each settles a line
+    # A line may straddle windows, so entropy findings are only kept at the
+    # end, on lines no named detector flagged in any window
+    flagged_lines: set[int] = set()
+    entropy_found: list[tuple[int, int, int, Finding]] = []
+
+    def scan_window(text: str | bytes, report_to: int) -> bool:
+        """Add the findings of a window; return True if the limit stopped it short of report_to."""
+        nonlocal named_count
+        lines = LineIndex(text)
+        candidates: list[re.Match[str] | re.Match[bytes]] = []
+
+        # With a limit, matches come in position order and stop after the
+        # line on which limit named findings are reached: every finding
+        # before that point is known, and at least limit of them are
+        stop_at = report_to
+        for detector, match in SCAN_ENGINE.iter_hits(text) if limit else SCAN_ENGINE.scan(text):
+            start = match.start()
+            if limit and start >= stop_at:
+                break
+            position = carry_offset + start
+            if not report_from <= start < report_to or position < resume_at.get(("pattern", detector), 0):
+                continue
+            resume_at[("pattern", detector)] = carry_offset + max(match.end(), start + 1)
+            if detector is ENTROPY_CANDIDATE:
+                candidates.append(match)
+                continue
+            line_num = lines.line_number(start) + carry_line - 1
+            flagged_lines.add(line_num)
+            ordered.append((0, detector_order[detector], position,
+                            Finding(FINDING_PATTERN, line_num, detector.description)))
+            named_count += 1
+            if limit and named_count == limit:
+                line_end = text.find(newline, start)
+                stop_at = min(report_to, len(text) if line_end == -1 else line_end + 1)
+
+        for match, label in select_high_entropy(candidates):
+            line_num = lines.line_number(match.start()) + carry_line - 1
+            entropy_found.append((0, detector_order[ENTROPY_CANDIDATE], carry_offset + match.start(),
+                                  Finding(FINDING_PATTERN, line_num, label)))
+
+        # The context behind stop_at still covers every value starting before it
+        for env_key, start in env_matcher.find(text if stop_at == report_to else text[:stop_at + context]):
+            position = carry_offset + start
+            if not report_from <= start < stop_at or position < resume_at.get(("env", env_key), 0):
+                continue
+            resume_at[("env", env_key)] = position + env_matcher.value_length(env_key, binary)
+            line_num = lines.line_number(start) + carry_line - 1
+            ordered.append((1, key_order[env_key], position, Finding(FINDING_ENV, line_num, env_key)))
+        return stop_at < report_to
+
+    pending: list[str] | list[bytes] = []
+    pending_size = 0
+    for chunk in chain((first,), chunks):
+        pending.append(chunk)
+        pending_size += len(chunk)
+        if len(carry) - report_from + pending_size < window_size + context:
+            continue
+
+        text = carry + empty.join(pending)
+        pending.clear()
+        pending_size = 0
+
+        # Report windows while a full lookahead is available behind them
+        while len(text) - report_from >= window_size + context:
+            report_to = report_from + window_size
+            if scan_window(text, report_to) or (limit and len(ordered) >= limit):
+                break
+
+            cut = max(0, report_to - context)
+            carry_line += text.count(newline, 0, cut)
+            carry_offset += cut
+            text = text[cut:]
+            report_from = report_to - cut
+        else:
+            carry = text
+            continue
+        break  # Later windows only hold findings past the limit
+    else:
+        text = carry + empty.join(pending)
+        if len(text) > report_from:
+            scan_window(text, len(text))
+
+    ordered.extend(item for item in entropy_found if item[3].line not in flagged_lines)
+    if limit:
+        ordered[:] = sorted(ordered, key=lambda item: item[2])[:limit]
+    ordered.sort(key=lambda item: item[:3])
+    return [finding for *_, finding in ordered]
+
+
+def get_worker_count() -> int:
+    """Return how many scan worker processes to use (1 disables the pool)."""
+    configured = os.environ.get(WORKERS_ENV_VAR, "").strip()
+    if configured:
+        try:
+            return max(1, int(configured))
+        except ValueError:
+            print(f"Warning: Ignoring invalid {WORKERS_ENV_VAR}={configured!r}", file=sys.stderr)
+
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+# Per-process .env matcher for pool workers, built once by _init_scan_worker()
+_worker_env_matcher: EnvValueMatcher | None = None
+
+
+def _init_scan_worker(env_values: dict[str, str], detectors: list[Detector]) -> None:
+    """Build the .env automaton and the scan engine once in each worker process."""
+    global _worker_env_matcher
+    _detach_profiler()
+    use_detectors(detectors)
+    _worker_env_matcher = EnvValueMatcher(env_values)
+
+
+def _scan_chunk(chunk: list[tuple[str, bytes]], limit: int = 0) -> list[tuple[str, list[Finding]]]:
+    """Scan one work unit of (object ID, content) pairs in a worker process."""
+    env_matcher = _worker_env_matcher if _worker_env_matcher is not None else EnvValueMatcher({})
+    return [(object_id, scan_content(content, env_matcher, limit=limit)) for object_id, content in chunk]
+
+
+class BlobScanner:
+    """Scan blobs inline, switching to a process pool once enough content has been seen.
+
+    Blobs are scanned in the calling process until PARALLEL_MIN_BYTES have
+    been submitted, so small commits never pay for pool start-up. After that,
+    blobs are grouped into work units of about PARALLEL_CHUNK_BYTES and
+    fanned out to worker processes. Only a bounded number of units is in
+    flight at once. If the pool cannot start or a worker fails, the affected
+    units are scanned inline, so results are never lost.
+
+    With a limit, each blob yields only its first limit findings (see
+    scan_content()).
+
+    Usage:
+        with BlobScanner(env_matcher) as scanner:
+            for object_id, content in blobs:
+                scanner.submit(object_id, content)
+            results = scanner.results()
+    """
+
+    def __init__(self, env_matcher: EnvValueMatcher, workers: int | None = None, limit: int = 0) -> None:
+        self._env_matcher = env_matcher
+        self._workers = get_worker_count() if workers is None else workers
+        self._limit = limit
+        self._results: dict[str, list[Finding]] = {}
+        self._flagged = False
+        self._submitted_bytes = 0
+        self._chunk: list[tuple[str, bytes]] = []
+        self._chunk_bytes = 0
+        self._executor: ProcessPoolExecutor | None = None
+        self._pool_failed = False
+        self._inflight: deque[tuple[Future[list[tuple[str, list[Finding]]]], list[tuple[str, bytes]]]] = deque()
+        self._scan = timed("scan", scan_content)
+
+    def __enter__(self) -> BlobScanner:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def submit(self, object_id: str, content: bytes) -> None:
+        """Queue one blob for scanning."""
+        self._submitted_bytes += len(content)
+        if not self._use_pool():
+            self._store([(object_id, self._scan(content, self._env_matcher, limit=self._limit))])
+            return
+
+        self._chunk.append((object_id, content))
+        self._chunk_bytes += len(content)
+        if self._chunk_bytes >= PARALLEL_CHUNK_BYTES:
+            self._dispatch_chunk()
+
+    def results(self) -> dict[str, list[Finding]]:
+        """Wait for all queued blobs and return findings by object ID."""
+        if self._chunk:
+            if self._executor is not None:
+                self._dispatch_chunk()
+            else:
+                self._scan_inline(self._chunk)
+                self._chunk = []
+                self._chunk_bytes = 0
+        while self._inflight:
+            self._collect_oldest()
+        return self._results
+
+    def drain(self) -> dict[str, list[Finding]]:
+        """Return findings of the blobs finished so far, without waiting, and forget them.
+
+        Long scans call this periodically so results do not accumulate in
+        the scanner.
+        """
+        while self._inflight and self._inflight[0][0].done():
+            self._collect_oldest()
+        finished, self._results = self._results, {}
+        return finished
+
+    def flagged(self) -> bool:
+        """Return whether any blob finished so far had findings, without waiting."""
+        while self._inflight and self._inflight[0][0].done():
+            self._collect_oldest()
+        return self._flagged
+
+    def _store(self, results: list[tuple[str, list[Finding]]]) -> None:
+        self._results.update(results)
+        self._flagged = self._flagged or any(findings for _, findings in results)
+
+    def _use_pool(self) -> bool:
+        if self._executor is not None:
+            return True
+        if self._pool_failed or self._workers <= 1 or self._submitted_bytes < PARALLEL_MIN_BYTES:
+            return False
+        try:
+            from concurrent.futures import ProcessPoolExecutor  # only large commits need it
+
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._workers,
+                initializer=_init_scan_worker,
+                initargs=(self._env_matcher.env_values, SCAN_ENGINE.detectors),
+            )
+        except (OSError, ImportError, NotImplementedError) as e:
+            print(f"Warning: Parallel scanning unavailable, scanning inline: {e}", file=sys.stderr)
+            self._pool_failed = True
+            return False
+        return True
+
+    def _dispatch_chunk(self) -> None:
+        chunk, self._chunk, self._chunk_bytes = self._chunk, [], 0
+        while len(self._inflight) >= self._workers * PARALLEL_INFLIGHT_PER_WORKER:
+            self._collect_oldest()
+
+        if self._executor is None:
+            self._scan_inline(chunk)
+            return
+        try:
+            self._inflight.append((self._executor.submit(_scan_chunk, chunk, self._limit), chunk))
+        except RuntimeError as e:  # Includes BrokenProcessPool
+            self._disable_pool(e)
+            self._scan_inline(chunk)
+
+    def _collect_oldest(self) -> None:
+        future, chunk = self._inflight.popleft()
+        try:
+            with phase("scan_wait") as span:
+                self._store(future.result())
+                span.add(sum(len(content) for _, content in chunk), len(chunk))
+        except Exception as e:  # noqa: BLE001 - any worker failure falls back to inline scanning
+            self._disable_pool(e)
+            self._scan_inline(chunk)
+
+    def _disable_pool(self, error: BaseException) -> None:
+        if not self._pool_failed:
+            print(f"Warning: Parallel scan worker failed, scanning inline: {error}", file=sys.stderr)
+        self._pool_failed = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _scan_inline(self, chunk: list[tuple[str, bytes]]) -> None:
+        self._store([
+            (object_id, self._scan(content, self._env_matcher, limit=self._limit)) for object_id, content in chunk
+        ])
+
+
+def get_git_common_dir() -> Path | None:
+    """Return the git directory shared by all worktrees, or None outside a repository."""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--git-common-dir"],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=SUBPROCESS_TIMEOUT,
+        )
+    except (OSError, subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        return None
+
+    output = result.stdout.strip() if isinstance(result.stdout, str) else ""
+    if not output or '\n' in output:
+        return None
+    git_dir = Path(output)
+    return git_dir if git_dir.is_dir() else None
+
+
+def compute_cache_scope(detectors: list[Detector], env_values: dict[str, str]) -> str:
+    """Fingerprint everything besides blob content that affects scan results.
+
+    Covers the detector set, the entropy thresholds and the filtered .env
+    values, so changing any of them invalidates cached results. Only a
+    digest is stored, never the values.
+    """
+    digest = hashlib.sha256(f"{CACHE_FILE_NAME}\0{SCAN_RESULTS_VERSION}".encode())
+    thresholds = get_entropy_thresholds()
+    digest.update(b'\0T' + json.dumps(thresholds, sort_keys=True).encode())
+    for detector in detectors:
+        digest.update(b'\0D')
+        digest.update(detector.pattern.pattern.encode('utf-8', errors='surrogatepass'))
+        digest.update(b'\0' + str(detector.pattern.flags).encode())
+        digest.update(b'\0' + detector.description.encode('utf-8', errors='surrogatepass'))
+        digest.update(b'\0' + '\0'.join(detector.prefixes).encode('utf-8', errors='surrogatepass'))
+        digest.update(b'\0R' + '\0'.join(detector.required).encode('utf-8', errors='surrogatepass'))
+        digest.update(b'\0' + detector.backend.encode())
+    for key, value in sorted(env_values.items()):
+        digest.update(b'\0E' + key.encode('utf-8', errors='surrogatepass'))
+        digest.update(b'\0' + value.encode('utf-8', errors='surrogatepass'))
+    return digest.hexdigest()
+
+
+class ScanCache:
+    """On-disk cache of per-blob scan results with LRU eviction.
+
+    Entries are keyed by (blob object ID, scope), where the scope comes from
+    compute_cache_scope(). SQLite in WAL mode lets concurrent hook processes
+    and worktrees share one cache file safely. Cache errors are never fatal:
+    a failed lookup is a miss and the blob is simply scanned.
+    """
+
+    def __init__(self, path: Path, scope: str, max_entries: int = CACHE_MAX_ENTRIES) -> None:
+        self.path = path
+        self.scope = scope
+        self.max_entries = max_entries
+        self._connection: sqlite3.Connection | None = None
+
+    @classmethod
+    def open(cls, scope: str) -> ScanCache | None:
+        """Open the cache for the current repository, or return None if unavailable."""
+        if os.environ.get(CACHE_ENV_VAR, "1").strip().lower() in ("0", "false", "no", "off"):
+            return None
+
+        git_dir = get_git_common_dir()
+        if git_dir is None:
+            return None
+
+        cache = cls(git_dir / CACHE_DIR_NAME / CACHE_FILE_NAME, scope)
+        try:
+            cache.connect()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Warning: Scan cache unavailable: {e}", file=sys.stderr)
+            return None
+        return cache
+
+    def connect(self) -> None:
+        """Open (and if needed create) the cache database."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=CACHE_BUSY_TIMEOUT, isolation_level=None)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS scan_results ("
+                " object_id TEXT NOT NULL,"
+                " scope TEXT NOT NULL,"
+                " findings TEXT NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (object_id, scope))"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS scan_results_last_used ON scan_results (last_used)"
+            )
+        except sqlite3.Error:
+            connection.close()
+            raise
+        self._connection = connection
+
+    def close(self) -> None:
+        """Close the database connection."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self) -> ScanCache:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def get_many(self, object_ids: Iterable[str]) -> dict[str, list[Finding]]:
+        """Return cached findings for every object ID that has an entry, marking them used."""
+        if self._connection is None:
+            return {}
+
+        ids = list(dict.fromkeys(object_ids))
+        results: dict[str, list[Finding]] = {}
+        try:
+            for offset in range(0, len(ids), CACHE_BATCH_SIZE):
+                batch = ids[offset:offset + CACHE_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT object_id, findings FROM scan_results"
+                    f" WHERE scope = ? AND object_id IN ({placeholders})",
+                    [self.scope, *batch],
+                ).fetchall()
+                for object_id, payload in rows:
+                    results[object_id] = [Finding(*item) for item in json.loads(payload)]
+
+            if results:
+                now = time.time()
+                with _SQLiteTransaction(self._connection):
+                    self._connection.executemany(
+                        "UPDATE scan_results SET last_used = ? WHERE object_id = ? AND scope = ?",
+                        [(now, object_id, self.scope) for object_id in results],
+                    )
+        except (sqlite3.Error, ValueError, TypeError) as e:
+            print(f"Warning: Scan cache lookup failed: {e}", file=sys.stderr)
+            return {}
+        return results
+
+    def put_many(self, results: dict[str, list[Finding]]) -> None:
+        """Store findings (an empty list means clean) and evict least recently used entries."""
+        if self._connection is None or not results:
+            return
+
+        now = time.time()
+        try:
+            with _SQLiteTransaction(self._connection):
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO scan_results (object_id, scope, findings, last_used)"
+                    " VALUES (?, ?, ?, ?)",
+                    [
+                        (object_id, self.scope, json.dumps([list(f) for f in findings]), now)
+                        for object_id, findings in results.items()
+                    ],
+                )
+                (count,) = self._connection.execute("SELECT COUNT(*) FROM scan_results").fetchone()
+                if count > self.max_entries:
+                    self._connection.execute(
+                        "DELETE FROM scan_results WHERE rowid IN ("
+                        " SELECT rowid FROM scan_results ORDER BY last_used LIMIT ?)",
+                        (count - self.max_entries,),
+                    )
+        except sqlite3.Error as e:
+            print(f"Warning: Scan cache update failed: {e}", file=sys.stderr)
+
+
+class _SQLiteTransaction:
+    """Explicit BEGIN IMMEDIATE/COMMIT block for an autocommit connection."""
+
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self._connection = connection
+
+    def __enter__(self) -> None:
+        self._connection.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type: type[BaseException] | None, *exc_info: object) -> None:
+        self._connection.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+
+
+# =============================================================================
+# Detector registry
+# =============================================================================
+
+
+def get_detector_pack_paths(project_root: Path, environ: dict[str, str] | None = None) -> list[Path]:
+    """Return the user-level then repo-level detector pack paths, existing or not.
+
+    Args:
+        project_root: Root of the project holding the repo-level pack
+        environ: Environment to read (a daemon client's), or None for os.environ
+    """
+    configured = (os.environ if environ is None else environ).get(DETECTORS_ENV_VAR)
+    if configured:
+        user_path = Path(configured).expanduser()
+    else:
+        config_home = os.environ.get("XDG_CONFIG_HOME") or str(Path.home() / ".config")
+        user_path = Path(config_home) / "check-secrets" / "detectors.json"
+    return [user_path, project_root / DETECTORS_FILE_NAME]
+
+
+def parse_detector_pack(data: bytes, source: str) -> list[dict[str, Any]]:
+    """Validate a detector pack and return its detectors in normalized form.
+
+    A pack is a JSON object ``{"version": 1, "detectors": [...]}``. Each
+    detector has an ``id``, a ``pattern`` (Python ``re`` syntax), a
+    ``description`` shown in findings, optional ``literals`` one of which
+    every match contains (blobs holding none of them are not scanned), an
+    optional ``backend`` from REGEX_BACKENDS and optional ``ignore_case``.
+
+    Raises:
+        ValueError: If the pack is malformed, naming source and the detector
+    """
+    try:
+        document = json.loads(data)
+    except ValueError as e:
+        raise ValueError(f"{source}: not valid JSON: {e}") from None
+    if not isinstance(document, dict) or document.get("version") != DETECTORS_VERSION:
+        raise ValueError(f"{source}: expected an object with \"version\": {DETECTORS_VERSION}")
+    entries = document.get("detectors", [])
+    if not isinstance(entries, list):
+        raise ValueError(f"{source}: \"detectors\" must be a list")
+
+    specs: list[dict[str, Any]] = []
+    seen: set[str] = set()
+    for index, entry in enumerate(entries):
+        where = f"{source}: detector {index}"
+        if not isinstance(entry, dict):
+            raise ValueError(f"{where}: must be an object")
+        unknown = set(entry) - DETECTOR_FIELDS
+        if unknown:
+            raise ValueError(f"{where}: unknown fields {', '.join(sorted(unknown))}")
+
+        detector_id = entry.get("id")
+        if not isinstance(detector_id, str) or not DETECTOR_ID_PATTERN.fullmatch(detector_id):
+            raise ValueError(f"{where}: \"id\" must be lowercase letters, digits, '.', '_' or '-'")
+        where = f"{source}: detector {detector_id!r}"
+        if detector_id in seen:
+            raise ValueError(f"{where}: duplicate id")
+        seen.add(detector_id)
+
+        pattern = entry.get("pattern")
+        description = entry.get("description")
+        literals = entry.get("literals", [])
+        backend = entry.get("backend", REGEX_BACKEND_DEFAULT)
+        ignore_case = entry.get("ignore_case", False)
+        if not isinstance(pattern, str) or not pattern:
+            raise ValueError(f"{where}: \"pattern\" must be a non-empty string")
+        if not isinstance(description, str) or not description:
+            raise ValueError(f"{where}: \"description\" must be a non-empty string")
+        if not isinstance(literals, list) or not all(
+            isinstance(literal, str) and literal for literal in literals
+        ):
+            raise ValueError(f"{where}: \"literals\" must be a list of non-empty strings")
+        if backend not in REGEX_BACKENDS:
+            raise ValueError(f"{where}: \"backend\" must be one of {', '.join(REGEX_BACKENDS)}")
+        if not isinstance(ignore_case, bool):
+            raise ValueError(f"{where}: \"ignore_case\" must be true or false")
+
+        try:
+            compiled = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        except re.error as e:
+            raise ValueError(f"{where}: invalid pattern: {e}") from None
+        # A pattern that matches nothing at all would flag every blob
+        if compiled.match("") is not None:
+            raise ValueError(f"{where}: pattern matches the empty string")
+
+        specs.append({
+            "id": detector_id,
+            "pattern": pattern,
+            "description": description,
+            "literals": literals,
+            "backend": backend,
+            "ignore_case": ignore_case,
+        })
+    return specs
+
+
+def _build_detector(spec: dict[str, Any]) -> Detector:
+    # Pack literals may sit anywhere in a match, so they gate a full pass
+    # rather than anchor one
+    return Detector(
+        re.compile(spec["pattern"], re.IGNORECASE if spec["ignore_case"] else 0),
+        spec["description"],
+        (),
+        spec["backend"],
+        spec["id"],
+        tuple(spec["literals"]),
+    )
+
+
+def _merge_detector_packs(
+    packs: list[tuple[Path, bytes]]
+) -> tuple[list[dict[str, Any]], list[str]]:
+    """Validate packs in order; an earlier pack keeps detectors whose id a later one reuses.
+
+    The user pack comes first, so a cloned repository cannot replace or
+    disable a user's detector by giving its own detector the same id.
+
+    Returns:
+        The merged detectors, and the ids of the later detectors dropped
+    """
+    merged: dict[str, dict[str, Any]] = {}
+    shadowed: list[str] = []
+    for path, data in packs:
+        for spec in parse_detector_pack(data, str(path)):
+            if spec["id"] in merged:
+                shadowed.append(spec["id"])
+            else:
+                merged[spec["id"]] = spec
+    return list(merged.values()), shadowed
+
+
+def read_detector_packs(
+    project_root: Path, environ: dict[str, str] | None = None
+) -> list[tuple[Path, bytes]]:
+    """Return the path and content of each detector pack that exists, user pack first.
+
+    Raises:
+        OSError: If a pack exists but cannot be read
+    """
+    packs: list[tuple[Path, bytes]] = []
+    for path in get_detector_pack_paths(project_root, environ):
+        try:
+            packs.append((path, path.read_bytes()))
+        except FileNotFoundError:
+            continue
+    return packs
+
+
+def detector_pack_key(packs: list[tuple[Path, bytes]]) -> str:
+    """Hash pack paths and contents into the key their validated detectors are cached under."""
+    digest = hashlib.sha256(f"detectors\0{DETECTORS_VERSION}".encode())
+    for path, data in packs:
+        digest.update(b'\0' + str(path).encode('utf-8', errors='surrogateescape') + b'\0')
+        digest.update(hashlib.sha256(data).digest())
+    return digest.hexdigest()[:32]
+
+
+def load_detector_registry(project_root: Path) -> list[Detector]:
+    """Return the built-in detectors plus those from the user and repo packs.
+
+    Validated packs are cached in the git common dir under a hash of their
+    paths and content, so unchanged packs are neither re-parsed nor
+    re-validated on later hook calls. Editing a pack changes the hash.
+    Repo detectors that reuse a user detector's id are reported on every call.
+
+    Raises:
+        OSError: If a pack exists but cannot be read
+        ValueError: If a pack is invalid
+    """
+    packs = read_detector_packs(project_root)
+    if not packs:
+        return DEFAULT_DETECTORS
+    key = detector_pack_key(packs)
+
+    cached = _read_registry_cache(key)
+    detectors: list[Detector] | None = None
+    if cached is not None:
+        specs, shadowed = cached
+        try:
+            detectors = _registry_detectors(specs)
+        except (KeyError, TypeError, re.error):
+            detectors = None  # Damaged cache entry; validate the packs again
+    if detectors is None:
+        specs, shadowed = _merge_detector_packs(packs)
+        _write_registry_cache(key, specs, shadowed)
+        detectors = _registry_detectors(specs)
+    if shadowed:
+        print(
+            f"Warning: Ignoring detectors in {packs[-1][0]} that reuse user detector ids:"
+            f" {', '.join(shadowed)}",
+            file=sys.stderr,
+        )
+    return detectors
+
+
+def _registry_detectors(specs: list[dict[str, Any]]) -> list[Detector]:
+    return [*SECRET_PATTERNS, *(_build_detector(spec) for spec in specs), ENTROPY_CANDIDATE]
+
+
+def _registry_cache_dir() -> Path | None:
+    git_dir = get_git_common_dir()
+    return git_dir / CACHE_DIR_NAME if git_dir is not None else None
+
+
+def _read_registry_cache(key: str) -> tuple[list[dict[str, Any]], list[str]] | None:
+    cache_dir = _registry_cache_dir()
+    if cache_dir is None:
+        return None
+    try:
+        entry = json.loads((cache_dir / f"detectors-{key}.json").read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(entry, dict):
+        return None
+    specs, shadowed = entry.get("detectors"), entry.get("shadowed")
+    if not isinstance(specs, list) or not isinstance(shadowed, list):
+        return None
+    return specs, [str(detector_id) for detector_id in shadowed]
+
+
+def _write_registry_cache(key: str, specs: list[dict[str, Any]], shadowed: list[str]) -> None:
+    """Store validated detectors for key, keeping the most recent DETECTOR_CACHE_MAX_ENTRIES.
+
+    Entries for other pack contents are kept, since worktrees of one
+    repository share the cache directory but may hold different repo packs.
+    """
+    cache_dir = _registry_cache_dir()
+    if cache_dir is None:
+        return
+    target = cache_dir / f"detectors-{key}.json"
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        temp_path.write_text(json.dumps({"detectors": specs, "shadowed": shadowed}), encoding='utf-8')
+        temp_path.replace(target)
+
+        entries: list[tuple[int, Path]] = []
+        for entry in cache_dir.glob("detectors-*.json"):
+            if entry != target:
+                try:
+                    entries.append((entry.stat().st_mtime_ns, entry))
+                except FileNotFoundError:
+                    continue  # Evicted by a concurrent hook
+        entries.sort()
+        for _, stale in entries[:max(0, len(entries) - DETECTOR_CACHE_MAX_ENTRIES + 1)]:
+            stale.unlink(missing_ok=True)
+    except OSError as e:
+        print(f"Warning: Detector cache update failed: {e}", file=sys.stderr)
+
+
+def get_scan_engine(detectors: list[Detector]) -> ScanEngine:
+    """Return the compiled engine for detectors, building it once per process."""
+    key = tuple(detectors)
+    engine = _engine_cache.pop(key, None)
+    if engine is None:
+        engine = ScanEngine(detectors)
+    # Re-inserting keeps the dict in least-recently-used order
+    _engine_cache[key] = engine
+    while len(_engine_cache) > ENGINE_CACHE_MAX_ENTRIES:
+        del _engine_cache[next(iter(_engine_cache))]
+    return engine
+
+
+def use_detectors(detectors: list[Detector]) -> None:
+    """Make detectors the set every scan in this process uses."""
+    global SCAN_ENGINE
+    if detectors != SCAN_ENGINE.detectors:
+        SCAN_ENGINE = get_scan_engine(detectors)
+
+
+def activate_detector_registry(project_root: Path) -> None:
+    """Load the project's detector registry and scan with it, blocking if it is invalid."""
+    try:
+        use_detectors(load_detector_registry(project_root))
+    except (OSError, ValueError) as e:
+        print(f"SECURITY: Invalid detector pack: {e}", file=sys.stderr)
+        sys.exit(ExitCode.BLOCKED)
+
+
+# =============================================================================
+# Phase profiling
+# =============================================================================
+
+
+class PhaseStats:
+    """Accumulated timings and volumes of one profiled phase."""
+
+    __slots__ = ("calls", "wall", "self_wall", "cpu", "bytes", "files")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.wall = 0.0  # Seconds, including nested phases
+        self.self_wall = 0.0  # Seconds, excluding nested phases
+        self.cpu = 0.0
+        self.bytes = 0
+        self.files = 0
+
+    def as_dict(self) -> dict[str, int | float]:
+        return {
+            "calls": self.calls,
+            "wall_ms": round(self.wall * 1000, 3),
+            "self_ms": round(self.self_wall * 1000, 3),
+            "cpu_ms": round(self.cpu * 1000, 3),
+            "bytes": self.bytes,
+            "files": self.files,
+        }
+
+
+class PhaseSpan:
+    """One timed run of a phase; nested spans are subtracted from its self time."""
+
+    __slots__ = ("profiler", "name", "bytes", "files", "_start", "_cpu_start", "_nested")
+
+    def __init__(self, profiler: ScanProfiler, name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.bytes = 0
+        self.files = 0
+        self._start = 0.0
+        self._cpu_start = 0.0
+        self._nested = 0.0
+
+    def __enter__(self) -> PhaseSpan:
+        self.profiler._stack.append(self)
+        self._cpu_start = time.process_time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.profiler._finish(self, time.perf_counter(), time.process_time())
+
+    def add(self, nbytes: int = 0, files: int = 1) -> None:
+        """Count content processed in this span."""
+        self.bytes += nbytes
+        self.files += files
+
+
+class _NullSpan:
+    """Stand-in span used while profiling is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> _NullSpan:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        return None
+
+    def add(self, nbytes: int = 0, files: int = 1) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class ScanProfiler:
+    """Per-phase wall/CPU time, volumes and peak memory of one hook run.
+
+    Phases nest: a phase's self time excludes the phases run inside it, so
+    the blob-reading loop reports its I/O separately from the scans it
+    calls. Peak memory comes from tracemalloc, which slows allocation-heavy
+    code while it is tracing.
+    """
+
+    def __init__(self, trace: bool = False) -> None:
+        import tracemalloc
+
+        self.trace = trace
+        self.phases: dict[str, PhaseStats] = {}
+        self.events: list[dict[str, object]] = []
+        self._stack: list[PhaseSpan] = []
+        self._tracemalloc = tracemalloc
+        tracemalloc.start()
+        self._cpu_origin = time.process_time()
+        self._origin = time.perf_counter()
+
+    def span(self, name: str) -> PhaseSpan:
+        return PhaseSpan(self, name)
+
+    def timed(self, name: str, func: Callable[..., _T]) -> Callable[..., _T]:
+        """Wrap func so each call is a span counting its first argument's length."""
+        def wrapper(content: Sized, *args: object, **kwargs: object) -> _T:
+            with self.span(name) as span:
+                span.add(len(content))
+                return func(content, *args, **kwargs)
+        return wrapper
+
+    def _finish(self, span: PhaseSpan, end: float, cpu_end: float) -> None:
+        self._stack.pop()
+        wall = end - span._start
+        if self._stack:
+            self._stack[-1]._nested += wall
+
+        stats = self.phases.get(span.name)
+        if stats is None:
+            stats = self.phases[span.name] = PhaseStats()
+        stats.calls += 1
+        stats.wall += wall
+        stats.self_wall += wall - span._nested
+        stats.cpu += cpu_end - span._cpu_start
+        stats.bytes += span.bytes
+        stats.files += span.files
+
+        if self.trace and len(self.events) < PROFILE_MAX_TRACE_EVENTS:
+            self.events.append({
+                "name": span.name,
+                "ph": "X",
+                "ts": round((span._start - self._origin) * 1e6, 1),
+                "dur": round(wall * 1e6, 1),
+                "pid": os.getpid(),
+                "tid": 0,
+                "args": {"bytes": span.bytes, "files": span.files},
+            })
+
+    def stop(self) -> dict[str, object]:
+        """Stop tracing memory and return the run's profile record."""
+        wall = time.perf_counter() - self._origin
+        cpu = time.process_time() - self._cpu_origin
+        _, peak = self._tracemalloc.get_traced_memory()
+        self._tracemalloc.stop()
+        return {
+            "version": PROFILE_VERSION,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "pid": os.getpid(),
+            "scan_mode": get_scan_mode(),
+            "wall_ms": round(wall * 1000, 3),
+            "cpu_ms": round(cpu * 1000, 3),
+            "tracemalloc_peak_bytes": peak,
+            "phases": {name: stats.as_dict() for name, stats in self.phases.items()},
+        }
+
+    def write(self, record: dict[str, object], directory: Path) -> None:
+        """Append record to the profile log and write the trace, if enabled.
+
+        Raises:
+            OSError: If the files cannot be written
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory / PROFILE_FILE_NAME, "a", encoding="utf-8") as log:
+            log.write(json.dumps(record) + "\n")
+        if self.trace:
+            trace = {"traceEvents": self.events, "displayTimeUnit": "ms", "otherData": record}
+            (directory / PROFILE_TRACE_FILE_NAME).write_text(json.dumps(trace), encoding="utf-8")
+
+
+# Profiler of the current run, or None (the default) when profiling is disabled
+_profiler: ScanProfiler | None = None
+
+
+def phase(name: str) -> PhaseSpan | _NullSpan:
+    """Return a span timing a phase of the current run (a no-op unless profiling)."""
+    return _NULL_SPAN if _profiler is None else _profiler.span(name)
+
+
+def timed(name: str, func: Callable[..., _T]) -> Callable[..., _T]:
+    """Return func, wrapped to time each call while profiling (unchanged otherwise)."""
+    return func if _profiler is None else _profiler.timed(name, func)
+
+
+def start_profiling() -> ScanProfiler | None:
+    """Start profiling this run if PROFILE_ENV_VAR asks for it."""
+    global _profiler
+    setting = os.environ.get(PROFILE_ENV_VAR, "").strip().lower()
+    if setting in ("", "0", "false", "no", "off"):
+        return None
+    if setting not in ("1", "true", "yes", "on", "json", "trace"):
+        print(f"Warning: Ignoring invalid {PROFILE_ENV_VAR}={setting!r}", file=sys.stderr)
+        return None
+    _profiler = ScanProfiler(trace=setting == "trace")
+    return _profiler
+
+
+def finish_profiling(profiler: ScanProfiler) -> None:
+    """Stop profiler and write its results under the repository's git directory."""
+    global _profiler
+    _profiler = None
+    record = profiler.stop()
+    git_dir = get_git_common_dir()
+    if git_dir is None:
+        print("Warning: Profile not written: not in a git repository", file=sys.stderr)
+        return
+    try:
+        profiler.write(record, git_dir / CACHE_DIR_NAME)
+    except OSError as e:
+        print(f"Warning: Profile not written: {e}", file=sys.stderr)
+
+
+def _detach_profiler() -> None:
+    """Drop an inherited profiler in a forked pool worker."""
+    global _profiler
+    if _profiler is not None:
+        _profiler = None
+        import tracemalloc
+
+        tracemalloc.stop()
+
+
+def main(payload: str | None = None) -> None:
+    """Main entry point for the security hook.
+
+    Args:
+        payload: Hook input already read from stdin by check_secrets_hook,
+            or None to read it here
+    """
+    if payload is None:
+        payload = sys.stdin.read()
+
+    # Parse hook input (fail-closed on parse error)
+    try:
+        command = read_hook_command(payload)
+    except ValueError as e:
+        print(f"SECURITY: Hook failed to parse input: {e}", file=sys.stderr)
+        sys.exit(ExitCode.BLOCKED)
+
+    if command is None:
+        sys.exit(ExitCode.SUCCESS)
+
+    # Get project directory (don't chdir - avoid global state mutation)
+    project_dir: str | None = os.environ.get("CLAUDE_PROJECT_DIR")
+    project_root = Path(project_dir) if project_dir else Path.cwd()
+
+    # Change to project directory for git operations
+    original_cwd = Path.cwd()
+    if project_dir:
+        os.chdir(project_root)
+
+    target = get_scan_target(command)
+    try:
+        # Hand the scan to a resident daemon if one is listening
+        response = request_daemon_scan(project_root, target)
+        if response is not None:
+            exit_code, stderr = response
+            sys.stderr.write(stderr)
+            sys.exit(exit_code)
+
+        _run_secret_check(project_root, target=target)
+    except Exception as e:  # noqa: BLE001 - an unexpected error must block, not fail open
+        print(f"SECURITY: Secret check failed unexpectedly: {type(e).__name__}: {e}", file=sys.stderr)
+        sys.exit(ExitCode.BLOCKED)
+    finally:
+        # Restore original directory
+        os.chdir(original_cwd)
+
+
+def get_scan_target(command: str) -> ScanTarget:
+    """Return what a hooked command needs checked: its staged changes, its pushed commits, or both."""
+    revisions = parse_push_revisions(command) if is_git_push_command(command) else None
+    return ScanTarget(staged=is_git_commit_command(command), revisions=revisions)
+
+
+def load_env_secrets(
+    project_root: Path, env_files: list[EnvFileStat] | None = None, persist: bool = True
+) -> EnvSecrets:
+    """Load and filter a project's env file values and build their automaton.
+
+    Large env sets are cached in the git common dir with their built
+    automaton, keyed by the path, mtime and size of every env file, so
+    unchanged env files are not parsed again.
+
+    Args:
+        project_root: Root directory of the project being checked (the cwd)
+        env_files: The project's env files if already discovered, or None to discover them
+        persist: Whether to use the on-disk cache (the daemon keeps its own in memory)
+    """
+    if env_files is None:
+        env_files = discover_env_files(project_root, get_env_globs())
+    cache_path = None
+    if persist and sum(env_file.size for env_file in env_files) >= ENV_CACHE_MIN_BYTES:
+        cache_path = _env_cache_path(project_root)
+    signature = [list(env_file) for env_file in env_files]
+
+    if cache_path is not None:
+        cached = _read_env_cache(cache_path, signature)
+        if cached is not None:
+            return cached
+
+    secret_env_values = load_env_values(project_root, env_files)
+
+    # Build the .env value automaton once (scan cost is independent of key count)
+    env_secrets = EnvSecrets(secret_env_values, EnvValueMatcher(secret_env_values))
+    if cache_path is not None and secret_env_values:
+        env_secrets.matcher.prepare()
+        _write_env_cache(cache_path, signature, env_secrets.matcher)
+    return env_secrets
+
+
+def _env_cache_path(project_root: Path) -> Path | None:
+    """Return the env cache file for project_root, or None if caching is off or unavailable."""
+    if os.environ.get(CACHE_ENV_VAR, "1").strip().lower() in ("0", "false", "no", "off"):
+        return None
+    git_dir = get_git_common_dir()
+    if git_dir is None:
+        return None
+    digest = hashlib.sha256(str(project_root.resolve()).encode('utf-8', errors='surrogateescape'))
+    return git_dir / CACHE_DIR_NAME / f"env-{digest.hexdigest()[:16]}.marshal"
+
+
+def _read_env_cache(cache_path: Path, signature: list[list[Any]]) -> EnvSecrets | None:
+    try:
+        state = marshal.loads(cache_path.read_bytes())
+        if state["version"] != ENV_CACHE_VERSION or state["files"] != signature:
+            return None
+        matcher = EnvValueMatcher.from_state(state["matcher"])
+    except (OSError, EOFError, ValueError, TypeError, KeyError):
+        return None  # Missing or damaged; parse the env files again
+    return EnvSecrets(matcher.env_values, matcher)
+
+
+def _write_env_cache(cache_path: Path, signature: list[list[Any]], matcher: EnvValueMatcher) -> None:
+    """Store the parsed values and built automaton, readable only by the user (they are secrets)."""
+    data = marshal.dumps(
+        {"version": ENV_CACHE_VERSION, "files": signature, "matcher": matcher.state()}
+    )
+    temp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        descriptor = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, "wb") as temp_file:
+            temp_file.write(data)
+        temp_path.replace(cache_path)
+    except OSError as e:
+        temp_path.unlink(missing_ok=True)
+        print(f"Warning: Env cache update failed: {e}", file=sys.stderr)
+
+
+def _run_secret_check(
+    project_root: Path, env_secrets: EnvSecrets | None = None, target: ScanTarget = ScanTarget()
+) -> None:
+    """Run the secret check logic, profiling its phases if PROFILE_ENV_VAR is set.
+
+    Args:
+        project_root: Root directory of the project being checked
+        env_secrets: Preloaded .env state (the daemon keeps it warm), or None to load it
+        target: The staged changes and/or commit range to check
+    """
+    profiler = start_profiling()
+    try:
+        _check_staged_changes(project_root, env_secrets, target)
+    finally:
+        if profiler is not None:
+            finish_profiling(profiler)
+
+
+def _check_staged_changes(
+    project_root: Path, env_secrets: EnvSecrets | None, target: ScanTarget = ScanTarget()
+) -> None:
+    """Scan the staged changes and/or a commit range, and exit with the verdict.
+
+    Blobs of a commit range are listed with one git call and scanned in one
+    batch with the staged blobs, so each distinct blob is scanned once.
+    """
+    with phase("load_detectors"):
+        activate_detector_registry(project_root)
+    with phase("load_ignore"):
+        ignore = load_secrets_ignore(project_root)
+
+    if env_secrets is None:
+        with phase("load_env"):
+            env_secrets = load_env_secrets(project_root)
+    secret_env_values, env_matcher = env_secrets
+
+    report = get_finding_report()
+    staged_files: list[StagedFile] = []
+
+    if target.staged and get_scan_mode() == SCAN_MODE_DIFF:
+        try:
+            with phase("read_diff"):
+                _scan_staged_diff(env_matcher, report, ignore)
+        except subprocess.CalledProcessError as e:
+            print(f"SECURITY: Failed to get staged changes: {e}", file=sys.stderr)
+            sys.exit(ExitCode.BLOCKED)
+        except subprocess.TimeoutExpired:
+            print("SECURITY: Timeout getting staged changes", file=sys.stderr)
+            sys.exit(ExitCode.BLOCKED)
+        except OSError as e:
+            print(f"SECURITY: Failed to read staged changes: {e}", file=sys.stderr)
+            sys.exit(ExitCode.BLOCKED)
+    elif target.staged:
+        # Get staged files with their blob IDs (fail-closed on error)
+        try:
+            with phase("list_staged") as span:
+                staged_files = get_staged_files()
+                span.add(files=len(staged_files))
+        except subprocess.CalledProcessError as e:
+            print(f"SECURITY: Failed to get staged files: {e}", file=sys.stderr)
+            sys.exit(ExitCode.BLOCKED)
+        except subprocess.TimeoutExpired:
+            print("SECURITY: Timeout getting staged files", file=sys.stderr)
+            sys.exit(ExitCode.BLOCKED)
+        except (OSError, UnicodeError) as e:
+            print(f"SECURITY: Failed to list staged files: {e}", file=sys.stderr)
+            sys.exit(ExitCode.BLOCKED)
+
+    if target.revisions is not None and not report.stopped:
+        try:
+            with phase("list_range") as span:
+                range_files = list_range_blobs(target.revisions)
+                span.add(files=len(range_files))
+        except subprocess.CalledProcessError as e:
+            detail = f": {e.stderr}" if e.stderr else ""
+            print(f"SECURITY: Failed to list the commits to check{detail}", file=sys.stderr)
+            sys.exit(ExitCode.BLOCKED)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print(f"SECURITY: Failed to list the commits to check: {e}", file=sys.stderr)
+            sys.exit(ExitCode.BLOCKED)
+        staged_files.extend(range_files)
+
+    if staged_files:
+        with phase("cache_open"):
+            cache = ScanCache.open(compute_cache_scope(SCAN_ENGINE.detectors, secret_env_values))
+        try:
+            _scan_staged_blobs(staged_files, env_matcher, report, cache, ignore)
+        except OSError as e:
+            print(f"SECURITY: Failed to read staged content: {e}", file=sys.stderr)
+            sys.exit(ExitCode.BLOCKED)
+        finally:
+            if cache is not None:
+                cache.close()
+
+    with phase("report"):
+        _report_findings(report, target)
+
+
+def _scan_staged_blobs(
+    staged_files: list[StagedFile],
+    env_matcher: EnvValueMatcher,
+    report: FindingReport,
+    cache: ScanCache | None = None,
+    ignore: PathMatcher | None = None,
+) -> None:
+    """Scan whole staged blobs, streaming every one through a single cat-file process.
+
+    Each distinct blob is scanned at most once, even when it is staged at
+    several paths, and blobs with cached results are not read at all.
+    Findings are added to report. In fail-fast mode, reading stops at the
+    first blob with findings and report is marked as stopped.
+
+    Binary blobs are rejected before their content is read: git's own
+    verdict from ``--numstat`` is trusted when no attribute forced it, and
+    every other blob is sniffed for a NUL before the rest is read.
+    Binary and ``-diff`` attributes alone never exclude text, since
+    ``-diff`` is routinely set on SQL dumps and fixtures just to quiet diffs.
+
+    Paths matched by ignore, or marked generated or vendored in the staged
+    .gitattributes, are dropped before any blob is read. All attributes
+    come from one check-attr call; if it fails, nothing is excluded by
+    attribute.
+
+    Raises:
+        OSError: If a staged blob cannot be read
+    """
+    # Skip binary files (case-insensitive), .env files themselves and ignored paths
+    with phase("path_filters") as span:
+        candidates = [
+            staged for staged in staged_files
+            if not (is_binary_file(staged.path) or is_env_file(staged.path)
+                    or (ignore and ignore.matches(staged.path)))
+        ]
+        attributes = get_path_attributes(sorted({staged.path for staged in candidates}))
+        span.add(files=len(staged_files))
+
+    # Group scannable paths by blob so identical content is scanned once
+    paths_by_blob: dict[str, list[str]] = {}
+    for file_path, object_id, binary in sorted(candidates):
+        if attributes is not None and file_path in attributes.excluded:
+            continue
+        # Skip blobs git found binary by content, without reading them. Numstat
+        # also reports "-" for attribute-marked paths; those are confirmed by content
+        if binary and attributes is not None and file_path not in attributes.binary:
+            continue
+        paths = paths_by_blob.setdefault(object_id, [])
+        if file_path not in paths:  # Staged and also changed by a commit being pushed
+            paths.append(file_path)
+
+    with phase("cache_lookup") as span:
+        results: dict[str, list[Finding]] = cache.get_many(paths_by_blob) if cache else {}
+        span.add(files=len(results))
+    scanned: dict[str, list[Finding]] = {}
+    settled: dict[str, list[Finding]] = {}
+
+    pending = [object_id for object_id in paths_by_blob if object_id not in results]
+    if report.fail_fast and any(results.values()):
+        pending = []
+        report.stopped = True
+    if pending:
+        # Scans run inside this phase and are timed separately, so its self time is I/O
+        with phase("read_blobs") as reading, BlobReader() as reader, \
+                BlobScanner(env_matcher, limit=report.scan_limit()) as scanner:
+            for object_id in pending:
+                # Read content from git staging area (not disk - avoids TOCTOU)
+                header = reader.request(object_id)
+                if header is None:
+                    continue
+                reading.add(header.size)
+
+                findings = _scan_blob_body(reader, scanner, header, env_matcher, report.scan_limit())
+                if findings is not None:
+                    settled[object_id] = findings
+                if report.fail_fast and (findings or scanner.flagged()):
+                    report.stopped = True
+                    break
+
+            # A stopped scan keeps what has finished; unfinished blobs are dropped
+            scanned = scanner.drain() if report.stopped else scanner.results()
+        scanned.update(settled)
+
+    if cache is not None:
+        # A blob that reached the limit may hold more findings than were scanned for
+        limit = report.scan_limit()
+        complete = {
+            object_id: findings for object_id, findings in scanned.items()
+            if not limit or len(findings) < limit
+        }
+        with phase("cache_store") as span:
+            cache.put_many(complete)
+            span.add(files=len(complete))
+    results.update(scanned)
+
+    with phase("format_findings"):
+        for object_id, file_paths in paths_by_blob.items():
+            for file_path in file_paths:
+                report.add(file_path, results.get(object_id, ()))
+
+
+def _scan_blob_body(
+    reader: BlobReader,
+    scanner: BlobScanner,
+    header: BlobHeader,
+    env_matcher: EnvValueMatcher,
+    limit: int = 0,
+) -> list[Finding] | None:
+    """Scan the body of a requested blob, or queue it on scanner.
+
+    Oversized blobs are streamed in windows instead of read whole, and
+    binary or tiny ones are settled without a scan.
+
+    Returns:
+        Findings for a blob settled here, or None if it was submitted to
+        scanner (its findings then come from the scanner)
+
+    Raises:
+        OSError: If the blob cannot be read
+    """
+    # Stream oversized blobs in windows instead of reading them whole
+    if header.size > MAX_FILE_SIZE:
+        chunks = reader.iter_body(header)
+        first = next(chunks)
+        if is_binary_content(first):
+            for _ in chunks:
+                pass
+            return []
+        with phase("scan_stream") as span:
+            findings = scan_stream(chain((first,), chunks), env_matcher, limit=limit)
+            span.add(header.size)
+        for _ in chunks:  # A limited scan may stop before the end of the blob
+            pass
+        return findings
+
+    # Raw bytes are scanned as-is; nothing is decoded
+    content = reader.read_text_body(header)
+    if content is None:
+        return []
+
+    # Skip tiny files (likely empty or minimal templates)
+    if len(content) < 10:
+        return []
+
+    scanner.submit(header.object_id, content)
+    return None
+
+
+def _scan_staged_diff(
+    env_matcher: EnvValueMatcher, report: FindingReport, ignore: PathMatcher | None = None
+) -> None:
+    """Scan only the lines added by the staged changes, adding findings to report.
+
+    Paths matched by ignore are skipped, and git itself leaves out paths
+    marked generated or vendored. In fail-fast mode the scan stops after
+    the first file with findings.
+
+    Raises:
+        OSError: If git cannot be started
+        subprocess.CalledProcessError: If git fails
+        subprocess.TimeoutExpired: If git does not respond in time
+    """
+    scan_block = timed("scan", scan_content)
+
+    for file_path, blocks in iter_staged_additions():
+        if is_binary_file(file_path) or is_env_file(file_path):
+            continue
+        if ignore and ignore.matches(file_path):
+            continue
+
+        file_findings: list[Finding] = []
+        limit = report.scan_limit()
+        for block in blocks:
+            # Blocks are in line order, so later ones only hold findings past the limit
+            if limit and len(file_findings) >= limit:
+                break
+            if len(block.text) > MAX_FILE_SIZE:
+                with phase("scan_stream") as span:
+                    findings = scan_stream([block.text], env_matcher, first_line=block.first_line, limit=limit)
+                    span.add(len(block.text))
+            else:
+                findings = scan_block(block.text, env_matcher, first_line=block.first_line, limit=limit)
+            file_findings.extend(findings)
+        report.add(file_path, file_findings)
+
+        if report.fail_fast and file_findings:
+            report.stopped = True
+            return
+
+
+def _report_findings(report: FindingReport, target: ScanTarget = ScanTarget()) -> None:
+    """Print findings and block the commit or push if there are any, otherwise allow it."""
+    all_pattern_issues, all_env_issues = report.pattern_issues, report.env_issues
+    if report.found():
+        if target.revisions is None:
+            where, action = "staged files", "committing"
+        else:
+            where = "staged files or commits" if target.staged else "commits"
+            action = "pushing"
+        print("\n" + "=" * 60, file=sys.stderr)
+        print(f"SECURITY WARNING: Potential secrets detected in {where}!", file=sys.stderr)
+        print("=" * 60 + "\n", file=sys.stderr)
+
+        if all_pattern_issues:
+            print("  Pattern-based detections:", file=sys.stderr)
+            for issue in sorted(all_pattern_issues):
+                print(f"    - {issue}", file=sys.stderr)
+            print("", file=sys.stderr)
+
+        if all_env_issues:
+            print("  Hardcoded .env values detected:", file=sys.stderr)
+            for issue in sorted(all_env_issues):
+                print(f"    - {issue}", file=sys.stderr)
+            print("", file=sys.stderr)
+
+        if report.suppressed or report.capped:
+            shown = []
+            if report.suppressed:
+                shown.append(f"{report.suppressed} more findings not shown")
+            if report.capped:
+                shown.append(f"{report.capped} files not scanned past their first {report.per_file}")
+            print(f"  ... and {', '.join(shown)} (at most "
+                  f"{report.per_file or 'all'} per file and {report.total or 'all'} in total; "
+                  f"see {MAX_FINDINGS_PER_FILE_ENV_VAR} and {MAX_FINDINGS_ENV_VAR}).\n",
+                  file=sys.stderr)
+        if report.stopped:
+            print(f"  Stopped at the first finding ({FAIL_FAST_ENV_VAR}); "
+                  "other files were not scanned.\n", file=sys.stderr)
+
+        print(f"Please remove secrets before {action}.", file=sys.stderr)
+        if target.revisions is not None:
+            print("Secrets in existing commits must be removed by rewriting them "
+                  "(e.g. git rebase -i).", file=sys.stderr)
+        if all_env_issues:
             print("Use environment variables at runtime instead of hardcoding values.", file=sys.stderr)
         print("Consider using a secrets manager for sensitive credentials.\n", file=sys.stderr)
         sys.exit(ExitCode.BLOCKED)
@@ -382,5 +3583,982 @@ def _run_secret_check(project_root: Path) -> None:
     sys.exit(ExitCode.SUCCESS)
 
 
+def check_commit_range(args: list[str]) -> None:
+    """Entry point for ``check_secrets.py --range <base>..<head> [<revision>...]``.
+
+    Scans every blob the commits in the range add or change, in one batch
+    (e.g. from a git pre-push hook or in CI), and exits BLOCKED if any of
+    them holds a secret. Revisions are passed to git log; of its options
+    only RANGE_REVISION_OPTIONS are accepted.
+    """
+    if not args:
+        print(f"Error: {RANGE_FLAG} needs a commit range such as origin/main..HEAD",
+              file=sys.stderr)
+        sys.exit(ExitCode.BLOCKED)
+    for arg in args:
+        if arg.startswith("-") and arg not in RANGE_REVISION_OPTIONS:
+            print(f"Error: Unsupported option for {RANGE_FLAG}: {arg}", file=sys.stderr)
+            sys.exit(ExitCode.BLOCKED)
+
+    _run_secret_check(Path.cwd(), target=ScanTarget(staged=False, revisions=args))
+
+
+# =============================================================================
+# History audit
+# =============================================================================
+
+
+def _split_stream(blocks: Iterable[bytes], separator: bytes) -> Iterator[bytes]:
+    """Yield the separator-terminated records of a block stream, one at a time."""
+    pending = b''
+    for block in blocks:
+        records = (pending + block).split(separator)
+        pending = records.pop()
+        yield from records
+    if pending:
+        yield pending
+
+
+def _stream_git(command: list[str]) -> Iterator[bytes]:
+    """Run a long git command and yield its stdout in blocks.
+
+    Raises:
+        OSError: If git cannot be started
+        subprocess.CalledProcessError: If git exits with an error
+        subprocess.TimeoutExpired: If git does not exit in time after its output ends
+    """
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        if process.stdout is None or process.stderr is None:
+            raise OSError("git produced no output stream")
+        while True:
+            block = process.stdout.read(BLOB_READ_CHUNK_SIZE)
+            if not block:
+                break
+            yield block
+        returncode = process.wait(timeout=SUBPROCESS_TIMEOUT)
+        if returncode != 0:
+            stderr = process.stderr.read().decode('utf-8', errors='replace').strip()
+            raise subprocess.CalledProcessError(returncode, command, stderr=stderr)
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        for stream in (process.stdout, process.stderr):
+            if stream is not None:
+                stream.close()
+
+
+def iter_reachable_blobs(revisions: list[str]) -> Iterator[tuple[str, str]]:
+    """Yield (object ID, path) for each blob reachable from revisions, once per blob.
+
+    ``git rev-list --objects`` lists every object once, at the first path it
+    is reached by, so content shared by many commits or paths appears once.
+
+    Raises:
+        OSError: If git cannot be started
+        subprocess.CalledProcessError: If git fails (e.g. an unknown revision)
+        subprocess.TimeoutExpired: If git does not exit in time after its output ends
+    """
+    command = ["git", "rev-list", "--objects", "--filter=object:type=blob", *revisions, "--"]
+    for line in _split_stream(_stream_git(command), b'\n'):
+        # Commits are listed without a path; blobs as "<id> <path>"
+        object_id, _, path = line.partition(b' ')
+        if path:
+            yield object_id.decode('ascii'), path.decode('utf-8', errors='surrogateescape')
+
+
+def find_blob_introductions(
+    object_ids: set[str], revisions: list[str]
+) -> dict[str, list[tuple[str, str]]]:
+    """Map each blob to the (commit, path) pairs that added or changed a path to it.
+
+    One oldest-first ``git log --raw`` pass over the history; only the
+    requested blobs are kept, so memory is bounded by the result. Merge
+    commits are not diffed, so a blob first created by a merge resolution
+    is not attributed.
+
+    Raises:
+        OSError: If git cannot be started
+        subprocess.CalledProcessError: If git fails
+        subprocess.TimeoutExpired: If git does not exit in time after its output ends
+    """
+    command = [
+        "git", "log", "--reverse", "--date-order", "--raw", "--no-renames", "--no-abbrev",
+        "--no-ext-diff", "--format=commit %H", "-z", *revisions, "--",
+    ]
+    introductions: dict[str, list[tuple[str, str]]] = {}
+    commit = ""
+    # With -z: "commit <id>\0" then "\n:<old mode> <new mode> <old id> <new id> <status>\0<path>\0"...
+    fields = _split_stream(_stream_git(command), b'\0')
+    for field in fields:
+        field = field.lstrip(b'\n')
+        if field.startswith(b'commit '):
+            commit = field[7:].decode('ascii')
+        elif field.startswith(b':'):
+            parts = field[1:].split()
+            path = next(fields, b'').decode('utf-8', errors='surrogateescape')
+            if len(parts) < 5 or parts[3].decode('ascii') not in object_ids:
+                continue
+            found = introductions.setdefault(parts[3].decode('ascii'), [])
+            if len(found) < HISTORY_MAX_INTRODUCTIONS:
+                found.append((commit, path))
+    return introductions
+
+
+class HistoryFinding(NamedTuple):
+    """A flagged blob from a history audit and where it entered the history."""
+
+    object_id: str
+    path: str  # First path rev-list reached the blob by
+    findings: list[Finding]
+
+
+class ScanJournal:
+    """Checkpoint journal of a long-running scan, so an interrupted run can resume.
+
+    Records every completed blob ID and the path and findings of flagged
+    blobs. Completions are buffered and committed every
+    JOURNAL_FLUSH_INTERVAL seconds or JOURNAL_FLUSH_ENTRIES blobs, so a
+    crash loses at most that much work. SQLite keeps lookups on disk, so
+    memory stays flat however many blobs have been recorded.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._connection: sqlite3.Connection | None = None
+        self._done: list[tuple[str]] = []
+        self._flagged: list[tuple[str, str, str]] = []
+        self._last_flush = time.monotonic()
+
+    @classmethod
+    def open(cls, name: str, restart: bool = False) -> ScanJournal | None:
+        """Open the journal called name in the current repository, or None if unavailable.
+
+        Args:
+            name: Identifies the scan; runs with the same name resume each other
+            restart: Discard an existing journal instead of resuming from it
+        """
+        git_dir = get_git_common_dir()
+        if git_dir is None:
+            return None
+
+        journal = cls(git_dir / CACHE_DIR_NAME / f"{name}.sqlite3")
+        try:
+            if restart:
+                journal.discard()
+            journal.connect()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Warning: Checkpoint journal unavailable, progress will not be saved: {e}",
+                  file=sys.stderr)
+            return None
+        return journal
+
+    def connect(self) -> None:
+        """Open (and if needed create) the journal database."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=CACHE_BUSY_TIMEOUT, isolation_level=None)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS done (object_id TEXT PRIMARY KEY) WITHOUT ROWID"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS flagged ("
+                " object_id TEXT PRIMARY KEY,"
+                " path TEXT NOT NULL,"
+                " findings TEXT NOT NULL)"
+            )
+        except sqlite3.Error:
+            connection.close()
+            raise
+        self._connection = connection
+
+    def close(self) -> None:
+        """Commit buffered completions and close the database."""
+        if self._connection is not None:
+            self.flush()
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self) -> ScanJournal:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def completed(self) -> int:
+        """Return how many blobs have been committed as completed."""
+        if self._connection is None:
+            return 0
+        (count,) = self._connection.execute("SELECT COUNT(*) FROM done").fetchone()
+        return int(count)
+
+    def completed_ids(self) -> Iterator[str]:
+        """Yield the ID of every blob committed as completed."""
+        self.flush()
+        if self._connection is not None:
+            for (object_id,) in self._connection.execute("SELECT object_id FROM done"):
+                yield object_id
+
+    def is_done(self, object_id: str) -> bool:
+        """Return True if a previous checkpoint recorded object_id as completed."""
+        if self._connection is None:
+            return False
+        row = self._connection.execute(
+            "SELECT 1 FROM done WHERE object_id = ?", (object_id,)
+        ).fetchone()
+        return row is not None
+
+    def record(self, object_id: str, path: str, findings: list[Finding]) -> None:
+        """Buffer a completed blob, committing a checkpoint when one is due."""
+        self._done.append((object_id,))
+        if findings:
+            self._flagged.append(
+                (object_id, path, json.dumps([list(finding) for finding in findings]))
+            )
+        if len(self._done) >= JOURNAL_FLUSH_ENTRIES \
+                or time.monotonic() - self._last_flush >= JOURNAL_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self) -> None:
+        """Commit buffered completions.
+
+        Raises:
+            sqlite3.Error: If the journal cannot be written
+        """
+        self._last_flush = time.monotonic()
+        if self._connection is None or not self._done:
+            return
+        with _SQLiteTransaction(self._connection):
+            self._connection.executemany("INSERT OR IGNORE INTO done VALUES (?)", self._done)
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO flagged VALUES (?, ?, ?)", self._flagged
+            )
+        self._done = []
+        self._flagged = []
+
+    def flagged(self) -> list[HistoryFinding]:
+        """Return every flagged blob recorded so far, in the order it was found."""
+        self.flush()
+        if self._connection is None:
+            return []
+        rows = self._connection.execute(
+            "SELECT object_id, path, findings FROM flagged ORDER BY rowid"
+        ).fetchall()
+        return [
+            HistoryFinding(object_id, path, [Finding(*item) for item in json.loads(payload)])
+            for object_id, path, payload in rows
+        ]
+
+    def discard(self) -> None:
+        """Close and delete the journal (after a completed scan, or to restart)."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+        self._done = []
+        self._flagged = []
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{self.path}{suffix}").unlink(missing_ok=True)
+
+
+class Baseline:
+    """Accepted findings and already-verified blobs for repeat history audits.
+
+    Stored as a JSON file meant to be reviewed and committed. Each accepted
+    finding is fingerprinted by (blob ID, detector, line); blob IDs are
+    content hashes, so a fingerprint never matches changed content. The
+    verified blobs are only trusted while the cache scope (detectors and
+    .env values) is the one they were verified under.
+    """
+
+    def __init__(self, path: Path, scope: str) -> None:
+        self.path = path
+        self.scope = scope
+        self.verified: set[str] = set()
+        self.accepted: dict[str, dict[str, str | int]] = {}  # Fingerprint -> reviewable entry
+
+    @staticmethod
+    def fingerprint(object_id: str, finding: Finding) -> str:
+        """Fingerprint a finding by its blob, detector and location."""
+        key = f"{object_id}\0{finding.kind}\0{finding.label}\0{finding.line}"
+        return hashlib.sha256(key.encode('utf-8', errors='surrogatepass')).hexdigest()[:32]
+
+    @classmethod
+    def load(cls, path: Path, scope: str) -> Baseline:
+        """Load the baseline at path, or start an empty one if it does not exist.
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If the file is not a baseline of this version
+        """
+        baseline = cls(path, scope)
+        try:
+            document = json.loads(path.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return baseline
+
+        if not isinstance(document, dict) or document.get("version") != BASELINE_VERSION:
+            raise ValueError(f"{path} is not a version {BASELINE_VERSION} secrets baseline")
+
+        accepted = document.get("accepted", [])
+        if isinstance(accepted, list):
+            baseline.accepted = {
+                str(entry["fingerprint"]): entry
+                for entry in accepted
+                if isinstance(entry, dict) and "fingerprint" in entry
+            }
+        if document.get("scope") == scope:
+            baseline.verified = set(document.get("verified_blobs", []))
+        elif document.get("verified_blobs"):
+            print("Warning: Baseline was made with other detectors or .env values; "
+                  "rescanning all blobs", file=sys.stderr)
+        return baseline
+
+    def is_verified(self, object_id: str) -> bool:
+        """Return True if object_id was scanned under the current scope."""
+        return object_id in self.verified
+
+    def new_findings(self, object_id: str, findings: list[Finding]) -> list[Finding]:
+        """Return the findings of a blob that the baseline does not accept."""
+        return [
+            finding for finding in findings
+            if self.fingerprint(object_id, finding) not in self.accepted
+        ]
+
+    def accept(self, entry: HistoryFinding) -> None:
+        """Accept every finding of a flagged blob."""
+        for finding in entry.findings:
+            self.accepted[self.fingerprint(entry.object_id, finding)] = {
+                "fingerprint": self.fingerprint(entry.object_id, finding),
+                "blob": entry.object_id,
+                "path": entry.path,
+                "line": finding.line,
+                "detector": finding.label,
+            }
+
+    def save(self) -> None:
+        """Write the baseline, one entry per line so reviews diff cleanly.
+
+        Raises:
+            OSError: If the file cannot be written
+        """
+        accepted = sorted(
+            self.accepted.values(), key=lambda entry: (str(entry["path"]), int(entry["line"]))
+        )
+        # json.dumps(indent=...) falls back to the slow pure-Python encoder, so
+        # entries are encoded one by one and joined by hand
+        text = "".join([
+            f'{{\n "version": {BASELINE_VERSION},\n "scope": {json.dumps(self.scope)},\n',
+            ' "accepted": [\n  ',
+            ",\n  ".join(map(json.dumps, accepted)),
+            '\n ],\n "verified_blobs": [\n  ',
+            ",\n  ".join(map(json.dumps, sorted(self.verified))),
+            '\n ]\n}\n',
+        ])
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        temp_path.write_text(text, encoding='utf-8')
+        temp_path.replace(self.path)
+
+
+def scan_history(
+    env_matcher: EnvValueMatcher,
+    revisions: list[str],
+    journal: ScanJournal | None = None,
+    baseline: Baseline | None = None,
+    ignore: PathMatcher | None = None,
+) -> tuple[list[HistoryFinding], int]:
+    """Scan every blob reachable from revisions exactly once.
+
+    Blobs stream through one cat-file process and the parallel scanner;
+    finished results are drained as the walk goes and only flagged blobs
+    are kept, so memory stays bounded on multi-GB object stores.
+
+    With a journal, blobs it already records as completed are skipped and
+    each finished blob is recorded, so an interrupted scan can resume. With
+    a baseline, its verified blobs are skipped and scanned ones are added
+    to its verified set; findings are returned unfiltered. Paths matched by
+    ignore are skipped (.gitattributes is not consulted, since it changes
+    across history).
+
+    Returns:
+        (flagged blobs in walk order, number of blobs scanned), both
+        including what earlier runs recorded in the journal
+
+    Raises:
+        OSError: If git cannot be started or a blob cannot be read
+        subprocess.CalledProcessError: If git fails
+        subprocess.TimeoutExpired: If git does not respond in time
+    """
+    flagged: list[HistoryFinding] = []
+    submitted: dict[str, str] = {}  # Object ID -> path, for blobs still in the scanner
+    scanned = 0
+    scanned_bytes = 0
+    show_progress = sys.stderr.isatty()
+    next_progress = time.monotonic() + HISTORY_PROGRESS_INTERVAL
+
+    def settle(object_id: str, path: str, findings: list[Finding]) -> None:
+        if baseline is not None:
+            baseline.verified.add(object_id)
+        if journal is not None:
+            journal.record(object_id, path, findings)
+        elif findings:
+            flagged.append(HistoryFinding(object_id, path, findings))
+
+    with BlobReader() as reader, BlobScanner(env_matcher) as scanner:
+        for object_id, path in iter_reachable_blobs(revisions):
+            if is_binary_file(path) or is_env_file(path):
+                continue
+            if ignore and ignore.matches(path):
+                continue
+            if journal is not None and journal.is_done(object_id):
+                continue
+            if baseline is not None and baseline.is_verified(object_id):
+                continue
+            header = reader.request(object_id)
+            if header is None:
+                continue  # Not present locally (e.g. a partial clone)
+            scanned += 1
+            scanned_bytes += header.size
+
+            findings = _scan_blob_body(reader, scanner, header, env_matcher)
+            if findings is None:
+                submitted[object_id] = path
+            else:
+                settle(object_id, path, findings)
+
+            for done_id, done_findings in scanner.drain().items():
+                settle(done_id, submitted.pop(done_id), done_findings)
+
+            if show_progress and time.monotonic() >= next_progress:
+                next_progress = time.monotonic() + HISTORY_PROGRESS_INTERVAL
+                print(
+                    f"Scanned {scanned} blobs ({scanned_bytes / (1024 * 1024):.0f} MB),"
+                    f" {len(flagged)} flagged",
+                    file=sys.stderr,
+                )
+
+        for done_id, done_findings in scanner.results().items():
+            settle(done_id, submitted.pop(done_id), done_findings)
+
+    if journal is not None:
+        # Blobs an earlier run flagged may sit at paths ignored since
+        flagged = [entry for entry in journal.flagged() if not (ignore and ignore.matches(entry.path))]
+        return flagged, journal.completed()
+    return flagged, scanned
+
+
+def open_history_journal(
+    env_values: dict[str, str], revisions: list[str], restart: bool = False
+) -> ScanJournal | None:
+    """Open the checkpoint journal of a history audit of revisions.
+
+    The journal name covers the cache scope and the revisions, so changed
+    detectors, .env values or revisions start a fresh scan rather than
+    resuming one whose results no longer apply.
+    """
+    digest = hashlib.sha256(compute_cache_scope(SCAN_ENGINE.detectors, env_values).encode())
+    for revision in revisions:
+        digest.update(b'\0' + revision.encode('utf-8', errors='surrogateescape'))
+    return ScanJournal.open(f"history-{digest.hexdigest()[:16]}", restart=restart)
+
+
+class HistoryOptions(NamedTuple):
+    """Command-line options of a history audit."""
+
+    revisions: list[str]
+    restart: bool  # Discard the checkpoint journal
+    baseline_path: Path | None
+    update_baseline: bool  # Accept new findings into the baseline
+
+
+def parse_history_args(args: list[str]) -> HistoryOptions:
+    """Parse the arguments after --history; everything unrecognized is a revision.
+
+    Raises:
+        ValueError: If an option is missing its value or used inconsistently
+    """
+    revisions: list[str] = []
+    restart = False
+    update_baseline = False
+    baseline_path: Path | None = None
+    remaining = iter(args)
+    for arg in remaining:
+        if arg == HISTORY_RESTART_FLAG:
+            restart = True
+        elif arg == BASELINE_UPDATE_FLAG:
+            update_baseline = True
+        elif arg == BASELINE_FLAG:
+            value = next(remaining, None)
+            if value is None:
+                raise ValueError(f"{BASELINE_FLAG} requires a file")
+            baseline_path = Path(value)
+        elif arg.startswith(BASELINE_FLAG + "="):
+            baseline_path = Path(arg.partition("=")[2])
+        else:
+            revisions.append(arg)
+
+    if update_baseline and baseline_path is None:
+        raise ValueError(f"{BASELINE_UPDATE_FLAG} requires {BASELINE_FLAG} <file>")
+    return HistoryOptions(revisions or ["--all"], restart, baseline_path, update_baseline)
+
+
+def audit_history(args: list[str]) -> None:
+    """Entry point for ``check_secrets.py --history [options] [<revision>...]``.
+
+    Scans every blob reachable from the revisions (default: all refs) in
+    the current repository, prints the findings with the commits that
+    introduced them, and exits BLOCKED if there are any.
+
+    Progress is checkpointed to a journal in the git directory. An
+    interrupted audit resumes where it stopped when run again with the same
+    revisions, unless --restart is given; the journal is deleted once the
+    audit completes.
+
+    With --baseline <file>, blobs the baseline has verified are not scanned
+    again and only findings it does not accept are reported. Adding
+    --update-baseline accepts those findings into the file, records every
+    scanned blob as verified, and exits SUCCESS.
+    """
+    try:
+        options = parse_history_args(args)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(ExitCode.BLOCKED)
+
+    revisions = options.revisions
+    activate_detector_registry(Path.cwd())
+    env_values, env_matcher = load_env_secrets(Path.cwd())
+
+    baseline: Baseline | None = None
+    if options.baseline_path is not None:
+        try:
+            baseline = Baseline.load(
+                options.baseline_path, compute_cache_scope(SCAN_ENGINE.detectors, env_values)
+            )
+        except (OSError, ValueError) as e:
+            print(f"Error: Cannot load baseline: {e}", file=sys.stderr)
+            sys.exit(ExitCode.BLOCKED)
+
+    journal = open_history_journal(env_values, revisions, restart=options.restart)
+    if journal is not None and journal.completed():
+        print(f"Resuming history audit: {journal.completed()} blobs already scanned "
+              f"(pass {HISTORY_RESTART_FLAG} to start over)", file=sys.stderr)
+
+    try:
+        flagged, scanned = scan_history(
+            env_matcher, revisions, journal, baseline, load_secrets_ignore(Path.cwd())
+        )
+        if baseline is not None:
+            if journal is not None:
+                baseline.verified.update(journal.completed_ids())
+            flagged = [
+                HistoryFinding(entry.object_id, entry.path, new_findings)
+                for entry in flagged
+                if (new_findings := baseline.new_findings(entry.object_id, entry.findings))
+            ]
+        introductions = (
+            find_blob_introductions({entry.object_id for entry in flagged}, revisions)
+            if flagged and not options.update_baseline else {}
+        )
+    except KeyboardInterrupt:
+        if journal is not None:
+            journal.flush()
+            print(f"\nHistory audit interrupted after {journal.completed()} blobs; "
+                  "run it again to resume.", file=sys.stderr)
+        sys.exit(ExitCode.BLOCKED)
+    except subprocess.CalledProcessError as e:
+        detail = f": {e.stderr}" if e.stderr else ""
+        print(f"Error: git failed during the history audit{detail}", file=sys.stderr)
+        sys.exit(ExitCode.BLOCKED)
+    except (OSError, subprocess.TimeoutExpired, sqlite3.Error) as e:
+        print(f"Error: History audit failed: {e}", file=sys.stderr)
+        sys.exit(ExitCode.BLOCKED)
+    finally:
+        if journal is not None:
+            journal.close()
+
+    if journal is not None:
+        journal.discard()
+
+    if baseline is not None and options.update_baseline:
+        for entry in flagged:
+            baseline.accept(entry)
+        try:
+            baseline.save()
+        except OSError as e:
+            print(f"Error: Cannot write baseline: {e}", file=sys.stderr)
+            sys.exit(ExitCode.BLOCKED)
+        print(f"Baseline {baseline.path} updated: {sum(len(e.findings) for e in flagged)} "
+              f"findings accepted, {len(baseline.verified)} blobs verified.")
+        sys.exit(ExitCode.SUCCESS)
+
+    new = " new" if baseline is not None else ""
+    if not flagged:
+        print(f"No{new} secrets found in {scanned} blobs.")
+        sys.exit(ExitCode.SUCCESS)
+
+    print("=" * 60)
+    print(f"History audit: potential{new} secrets in {len(flagged)} of {scanned} blobs")
+    print("=" * 60)
+    for entry in flagged:
+        pattern_issues, env_issues = format_findings(entry.path, entry.findings)
+        print()
+        for issue in pattern_issues + env_issues:
+            print(f"  - {issue}")
+        introduced = ", ".join(
+            f"{commit[:12]} ({path})" for commit, path in introductions.get(entry.object_id, ())
+        )
+        print(f"    blob {entry.object_id[:12]}, introduced in: {introduced or 'unknown (merge)'}")
+    sys.exit(ExitCode.BLOCKED)
+
+
+# =============================================================================
+# Resident scan daemon
+# =============================================================================
+
+
+def daemon_supported() -> bool:
+    """Return True if this platform has Unix sockets and fork()."""
+    return hasattr(socket, "AF_UNIX") and hasattr(os, "fork") and hasattr(os, "getuid")
+
+
+def _source_fingerprint() -> str:
+    """Fingerprint this script, whose detectors a daemon must match to serve a client."""
+    stat = Path(__file__).resolve().stat()
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def get_daemon_socket_path() -> Path:
+    """Return the per-user socket path of the daemon for this copy of the script.
+
+    Each installed copy gets its own socket, so daemons for different
+    versions never serve each other's clients.
+    """
+    configured = os.environ.get(DAEMON_SOCKET_ENV_VAR)
+    if configured:
+        return Path(configured)
+
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        base = Path(runtime_dir) / "check-secrets"
+    else:
+        base = Path(tempfile.gettempdir()) / f"check-secrets-{os.getuid()}"
+    script_id = hashlib.sha256(str(Path(__file__).resolve()).encode()).hexdigest()[:12]
+    return base / f"daemon-{script_id}.sock"
+
+
+def _is_private_directory(directory: Path) -> bool:
+    """Check that directory is a real directory owned by this user and closed to others."""
+    try:
+        stat = directory.lstat()
+    except OSError:
+        return False
+    return (
+        (stat.st_mode & 0o170000) == 0o040000
+        and stat.st_uid == os.getuid()
+        and stat.st_mode & 0o077 == 0
+    )
+
+
+def _send_message(sock: socket.socket, payload: dict[str, object]) -> None:
+    sock.sendall(json.dumps(payload).encode('utf-8') + b'\n')
+
+
+def _recv_message(sock: socket.socket) -> dict[str, object]:
+    """Read one newline-terminated JSON object.
+
+    Raises:
+        OSError: If the connection fails or times out
+        ValueError: If the message is oversized or not a JSON object
+    """
+    buffer = bytearray()
+    while not buffer.endswith(b'\n'):
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        buffer += chunk
+        if len(buffer) > DAEMON_MAX_MESSAGE_SIZE:
+            raise ValueError("message too large")
+
+    message = json.loads(buffer)
+    if not isinstance(message, dict):
+        raise ValueError("message is not an object")
+    return message
+
+
+def _forwarded_environment() -> dict[str, str]:
+    """Return the client environment variables that affect a scan."""
+    return {
+        key: value
+        for key, value in os.environ.items()
+        if key.startswith(DAEMON_FORWARDED_ENV_PREFIXES) or key == "CLAUDE_PROJECT_DIR"
+    }
+
+
+def request_daemon_scan(
+    project_root: Path, target: ScanTarget = ScanTarget()
+) -> tuple[int, str] | None:
+    """Ask a running daemon to scan the current directory's staged changes and/or commits.
+
+    Returns:
+        (exit code, stderr text) from the daemon, or None when no usable
+        daemon is available and the caller should scan in-process. A daemon
+        that accepts the request but does not answer in time yields a
+        blocking result (fail-closed).
+    """
+    if os.environ.get(DAEMON_ENV_VAR, "1").strip().lower() in ("0", "false", "no", "off"):
+        return None
+    if not daemon_supported():
+        return None
+
+    socket_path = get_daemon_socket_path()
+    if not _is_private_directory(socket_path.parent):
+        return None
+
+    request: dict[str, object] = {
+        "version": DAEMON_PROTOCOL_VERSION,
+        "fingerprint": _source_fingerprint(),
+        "cwd": str(Path.cwd()),
+        "project_root": str(project_root),
+        "env": _forwarded_environment(),
+        "staged": target.staged,
+        "revisions": target.revisions,
+    }
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(DAEMON_CONNECT_TIMEOUT)
+            sock.connect(str(socket_path))
+            sock.settimeout(DAEMON_RESPONSE_TIMEOUT)
+            _send_message(sock, request)
+            response = _recv_message(sock)
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None  # No daemon running
+    except socket.timeout:
+        return ExitCode.BLOCKED, "SECURITY: Scan daemon did not respond in time\n"
+    except (OSError, ValueError) as e:
+        print(f"Warning: Scan daemon unavailable, scanning in-process: {e}", file=sys.stderr)
+        return None
+
+    exit_code = response.get("exit_code")
+    stderr = response.get("stderr")
+    if response.get("status") != "ok" or exit_code not in (ExitCode.SUCCESS, ExitCode.BLOCKED) \
+            or not isinstance(stderr, str):
+        return None  # Stale daemon (it restarts itself) or unexpected reply
+    return int(exit_code), stderr
+
+
+class ScanDaemon:
+    """Long-lived scan server that forks a worker per request from a warm parent.
+
+    The parent holds the compiled detectors and, per project, the parsed
+    .env values with their prebuilt automaton (reloaded when the .env file
+    changes). Each request is served by a forked child that inherits that
+    state, switches to the client's directory and environment, and runs the
+    regular in-process check. The child's exit code and stderr are returned
+    to the client. Children run concurrently and share the on-disk scan
+    cache.
+
+    If this script changes on disk, requests are answered as stale, so
+    clients scan in-process, and the daemon re-executes itself to load the
+    new detectors.
+    """
+
+    def __init__(self, socket_path: Path) -> None:
+        self.socket_path = socket_path
+        self.fingerprint = _source_fingerprint()
+        self.restart = False
+        self._env_cache: dict[Path, tuple[list[EnvFileStat], EnvSecrets, str]] = {}
+        self._detectors: dict[str, list[Detector]] = {}
+        self._children: set[int] = set()
+        self._last_request = time.monotonic()
+
+    def serve(self) -> None:
+        """Accept requests until idle for DAEMON_IDLE_TIMEOUT or a restart is needed.
+
+        Raises:
+            OSError: If the socket cannot be created or another daemon is listening
+        """
+        directory = self.socket_path.parent
+        directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        if not _is_private_directory(directory):
+            raise OSError(f"Socket directory {directory} must be owned by you with mode 0700")
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            if probe.connect_ex(str(self.socket_path)) == 0:
+                raise OSError(f"A daemon is already listening on {self.socket_path}")
+        self.socket_path.unlink(missing_ok=True)
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            server.bind(str(self.socket_path))
+            os.chmod(self.socket_path, 0o600)
+            server.listen(64)
+            server.settimeout(DAEMON_POLL_INTERVAL)
+            try:
+                while not self.restart:
+                    self._reap_children()
+                    try:
+                        connection, _ = server.accept()
+                    except socket.timeout:
+                        idle = time.monotonic() - self._last_request
+                        if idle > DAEMON_IDLE_TIMEOUT and not self._children:
+                            break
+                        continue
+                    with connection:
+                        self._handle(server, connection)
+            finally:
+                self.socket_path.unlink(missing_ok=True)
+
+    def _handle(self, server: socket.socket, connection: socket.socket) -> None:
+        self._last_request = time.monotonic()
+        connection.settimeout(DAEMON_READ_TIMEOUT)
+        try:
+            request = _recv_message(connection)
+            if request.get("version") != DAEMON_PROTOCOL_VERSION \
+                    or request.get("fingerprint") != self.fingerprint:
+                _send_message(connection, {"status": "stale"})
+                self.restart = _source_fingerprint() != self.fingerprint
+                return
+            env = request.get("env")
+            environ = {str(key): str(value) for key, value in env.items()} \
+                if isinstance(env, dict) else None
+            globs = get_env_globs(environ) if environ is not None else DEFAULT_ENV_GLOBS
+            project_root = Path(str(request["project_root"]))
+            env_secrets, warnings = self._env_secrets(project_root, globs)
+            self._prepare_detectors(project_root, environ)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: Dropped malformed daemon request: {e}", file=sys.stderr)
+            return
+
+        while len(self._children) >= DAEMON_MAX_CHILDREN:
+            self._reap_children(block=True)
+
+        pid = os.fork()
+        if pid == 0:
+            # Child: never return into the accept loop
+            exit_status = 0
+            try:
+                server.close()
+                connection.settimeout(DAEMON_RESPONSE_TIMEOUT)
+                _send_message(connection, _scan_for_client(request, env_secrets, warnings))
+            except BaseException:  # noqa: BLE001 - the client treats a dropped reply as unavailable
+                exit_status = 1
+            finally:
+                os._exit(exit_status)
+        self._children.add(pid)
+
+    def _env_secrets(
+        self, project_root: Path, globs: tuple[str, ...] = DEFAULT_ENV_GLOBS
+    ) -> tuple[EnvSecrets, str]:
+        """Return the project's .env state, reloading it when an env file changes."""
+        env_files = discover_env_files(project_root, globs)
+
+        cached = self._env_cache.pop(project_root, None)
+        if cached is None or cached[0] != env_files:
+            warnings = io.StringIO()
+            with redirect_stderr(warnings):
+                env_secrets = load_env_secrets(project_root, env_files, persist=False)
+            env_secrets.matcher.prepare()
+            cached = (env_files, env_secrets, warnings.getvalue())
+
+        # Re-inserting keeps the dict in least-recently-used order
+        self._env_cache[project_root] = cached
+        while len(self._env_cache) > DAEMON_MAX_PROJECTS:
+            del self._env_cache[next(iter(self._env_cache))]
+        return cached[1], cached[2]
+
+    def _prepare_detectors(self, project_root: Path, environ: dict[str, str] | None) -> None:
+        """Compile the project's detector packs here, so forked children reuse the engine."""
+        try:
+            packs = read_detector_packs(project_root, environ)
+        except OSError:
+            return  # The child reports the unreadable pack
+        if not packs:
+            return
+
+        key = detector_pack_key(packs)
+        detectors = self._detectors.pop(key, None)
+        if detectors is None:
+            try:
+                detectors = _registry_detectors(_merge_detector_packs(packs)[0])
+            except ValueError:
+                return  # The child reports the invalid pack
+        # Re-inserting keeps the dict in least-recently-used order
+        self._detectors[key] = detectors
+        while len(self._detectors) > ENGINE_CACHE_MAX_ENTRIES:
+            del self._detectors[next(iter(self._detectors))]
+        get_scan_engine(detectors)
+
+    def _reap_children(self, block: bool = False) -> None:
+        while self._children:
+            try:
+                pid, _ = os.waitpid(-1, 0 if block else os.WNOHANG)
+            except ChildProcessError:
+                self._children.clear()
+                return
+            if pid == 0:
+                return
+            self._children.discard(pid)
+            block = False
+
+
+def _scan_for_client(
+    request: dict[str, object], env_secrets: EnvSecrets, warnings: str
+) -> dict[str, object]:
+    """Run the in-process check for a client request (in a forked daemon child)."""
+    env = request.get("env")
+    if isinstance(env, dict):
+        for key in [key for key in os.environ if key.startswith(DAEMON_FORWARDED_ENV_PREFIXES)]:
+            del os.environ[key]
+        os.environ.pop("CLAUDE_PROJECT_DIR", None)
+        os.environ.update({str(key): str(value) for key, value in env.items()})
+
+    stderr = io.StringIO(warnings)
+    stderr.seek(0, io.SEEK_END)
+    exit_code: int = ExitCode.BLOCKED
+    with redirect_stderr(stderr):
+        try:
+            os.chdir(str(request["cwd"]))
+            revisions = request.get("revisions")
+            target = ScanTarget(
+                staged=request.get("staged") is not False,
+                revisions=[str(revision) for revision in revisions]
+                if isinstance(revisions, list) else None,
+            )
+            _run_secret_check(Path(str(request["project_root"])), env_secrets, target)
+        except SystemExit as e:
+            exit_code = e.code if e.code in (ExitCode.SUCCESS, ExitCode.BLOCKED) else ExitCode.BLOCKED
+        except Exception as e:  # noqa: BLE001 - any failure blocks the commit
+            print(f"SECURITY: Scan daemon failed: {e}", file=sys.stderr)
+
+    return {"status": "ok", "exit_code": int(exit_code), "stderr": stderr.getvalue()}
+
+
+def serve_daemon() -> None:
+    """Entry point for ``check_secrets.py --daemon``."""
+    if not daemon_supported():
+        print("Error: The scan daemon needs Unix sockets and fork()", file=sys.stderr)
+        sys.exit(1)
+
+    daemon = ScanDaemon(get_daemon_socket_path())
+    try:
+        daemon.serve()
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if daemon.restart:
+        os.execv(sys.executable, [sys.executable, str(Path(__file__).resolve()), "--daemon"])
+
+
 if __name__ == "__main__":
-    main()
+    if sys.argv[1:] == ["--daemon"]:
+        serve_daemon()
+    elif sys.argv[1:2] == [HISTORY_FLAG]:
+        audit_history(sys.argv[2:])
+    elif sys.argv[1:2] == [RANGE_FLAG]:
+        check_commit_range(sys.argv[2:])
+    else:
+        main()
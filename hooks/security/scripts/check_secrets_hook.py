@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Entry point for the check_secrets security hook.
+
+Claude Code runs this on every Bash tool call, and nearly all of them are
+not commits or pushes. Those are answered here, without importing the
+scanner in check_secrets.py or compiling its detectors. Input that does not
+mention git at all is answered before json is even imported. This file is kept small because a script run directly is
+recompiled on every launch, while imported modules are loaded from cached
+bytecode.
+
+Commit and push calls, and input that fails to parse, are handed to
+check_secrets.main(), which scans (or blocks) as before.
+
+Exit codes:
+    0 - Not a commit or push, or no secrets detected
+    2 - Secrets detected OR error occurred, commit or push blocked (fail-closed)
+"""
+from __future__ import annotations
+
+import sys
+
+
+def is_git_commit_command(command: str) -> bool:
+    """Check if the command is a git commit operation."""
+    cmd_lower = command.lower()
+    return "git" in cmd_lower and "commit" in cmd_lower
+
+
+def is_git_push_command(command: str) -> bool:
+    """Check if the command is a git push operation."""
+    cmd_lower = command.lower()
+    return "git" in cmd_lower and "push" in cmd_lower
+
+
+def read_hook_command(payload: str) -> str | None:
+    """Return the command of a Bash hook call that may be a git commit or push.
+
+    Args:
+        payload: Hook input JSON read from stdin
+
+    Returns:
+        The command to check, or None if the call is not ours to check
+
+    Raises:
+        ValueError: If the payload is not a JSON object
+    """
+    import json
+
+    input_data = json.loads(payload)
+    if not isinstance(input_data, dict):
+        raise ValueError("hook input is not a JSON object")
+
+    # Only check Bash tool with git commit or push operations
+    tool_name = input_data.get("tool_name", "")
+    tool_input_raw = input_data.get("tool_input")
+    if tool_name != "Bash" or not isinstance(tool_input_raw, dict):
+        # Not a valid Bash tool input - allow to proceed (not our concern)
+        return None
+
+    # Extract command safely with type narrowing
+    command_raw = tool_input_raw.get("command")
+    command: str = str(command_raw) if command_raw is not None else ""
+    if is_git_commit_command(command) or is_git_push_command(command):
+        return command
+    return None
+
+
+def run() -> None:
+    """Reject calls that neither commit nor push, then hand everything else to the scanner."""
+    payload = sys.stdin.read()
+    # Every commit or push command contains "git". A \u escape could spell it
+    # out in the JSON, so only escape-free input is rejected on sight
+    if "git" not in payload.lower() and "\\u" not in payload:
+        sys.exit(0)  # ExitCode.SUCCESS
+
+    try:
+        if read_hook_command(payload) is None:
+            sys.exit(0)  # ExitCode.SUCCESS
+    except ValueError:
+        pass  # check_secrets.main() reports it and blocks
+
+    try:
+        import check_secrets
+    except Exception as e:  # noqa: BLE001 - a broken scanner must still block
+        print(f"SECURITY: Failed to load secret scanner: {e}", file=sys.stderr)
+        sys.exit(2)  # ExitCode.BLOCKED
+
+    check_secrets.main(payload)
+
+
+if __name__ == "__main__":
+    run()